@@ -0,0 +1,57 @@
+"""Run async def callbacks on an event loop shared by all request threads"""
+from __future__ import print_function
+
+import asyncio
+import inspect
+import os
+import threading
+from functools import wraps
+
+_LOOP_LOCK = threading.Lock()
+_LOOP_STATE = {}  # type: Dict[str, Any]
+
+
+def get_loop():
+    # type: () -> asyncio.AbstractEventLoop
+    """The shared event loop, running in a daemon thread. A new one is started
+    in forked workers since the thread of the parent does not survive a fork."""
+    with _LOOP_LOCK:
+        if _LOOP_STATE.get("pid") != os.getpid():
+            loop = asyncio.new_event_loop()
+            loop_thread = threading.Thread(
+                target=loop.run_forever, name="easydash-event-loop"
+            )
+            loop_thread.daemon = True
+            loop_thread.start()
+            _LOOP_STATE.update(pid=os.getpid(), loop=loop, thread=loop_thread)
+        return _LOOP_STATE["loop"]
+
+
+def run_coroutine(coro, timeout=None):
+    """Run a coroutine on the shared loop and wait for the result
+    >>> async def add_one(x):
+    ...     await asyncio.sleep(0)
+    ...     return x + 1
+    >>> run_coroutine(add_one(1))
+    2
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def as_sync(func, timeout=None):
+    """A blocking version of an async def function (other functions are unchanged)
+    >>> async def update_out(value_of_inp):
+    ...     return value_of_inp * 2
+    >>> as_sync(update_out)(3), as_sync(update_out).__name__
+    (6, 'update_out')
+    >>> as_sync(len) is len
+    True
+    """
+    if not inspect.iscoroutinefunction(func):
+        return func
+
+    @wraps(func)
+    def sync_func(*args, **kwargs):
+        return run_coroutine(func(*args, **kwargs), timeout=timeout)
+
+    return sync_func
@@ -0,0 +1,350 @@
+"""Result caches for the automatic callbacks"""
+from __future__ import print_function
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+_MISSING = object()
+
+
+def make_cache_key(*key_parts):
+    # type: (...) -> str
+    """Builds a stable string key from callback names and argument values.
+    >>> make_cache_key("update_output_1", ("a", 5, None))
+    '["update_output_1", ["a", 5, null]]'
+    >>> make_cache_key("update_output_1", ({"b": 1, "a": 2},))
+    '["update_output_1", [{"a": 2, "b": 1}]]'
+    """
+    return json.dumps(key_parts, sort_keys=True, default=repr)
+
+
+class ResultCache(object):
+    """A thread-safe LRU cache with an optional time-to-live
+    >>> c_cache = ResultCache(max_size=2)
+    >>> c_cache.set("a", 1)
+    >>> c_cache.set("b", 2)
+    >>> c_cache.get("a")
+    1
+    >>> c_cache.set("c", 3)  # evicts b since a was used more recently
+    >>> c_cache.get("b", "missing")
+    'missing'
+    >>> sorted(c_cache.stats().items())
+    [('evictions', 1), ('hits', 1), ('max_size', 2), ('misses', 1), ('size', 2), ('ttl', None)]
+    >>> c_cache.invalidate("a")
+    >>> len(c_cache)
+    1
+    >>> c_cache.invalidate()
+    >>> len(c_cache)
+    0
+    """
+
+    def __init__(
+        self,
+        max_size=128,  # type: Optional[int]
+        ttl=None,  # type: Optional[float]
+        timer=time.time,
+    ):
+        """
+        :param max_size: the maximum number of entries (None for unlimited)
+        :param ttl: the number of seconds an entry stays valid (None for forever)
+        :param timer: the clock used for expiring entries
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        """Get an entry and mark it as recently used
+        :param key: the key to look up
+        :param default: the value to return when the key is missing or expired
+        :param count: update the hit and miss counters
+        :return: the stored value or default
+        """
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._timer():
+                    # reinsert so the entry becomes the most recently used
+                    self._data[key] = entry
+                    if count:
+                        self.hits += 1
+                    return value
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store an entry evicting the least recently used ones if needed"""
+        expires_at = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires_at, value)
+            while self.max_size is not None and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Remove one key or (by default) every entry from the cache"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        # type: () -> Dict[str, Any]
+        """The hit, miss and eviction counters along with the cache settings"""
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=len(self._data),
+                max_size=self.max_size,
+                ttl=self.ttl,
+            )
+
+
+class SqliteCache(object):
+    """An LRU cache in a SQLite file which every worker process on the host
+    shares (put it on /dev/shm to keep it in memory), with the interface of
+    ResultCache. The values are pickled and the least recently used entries
+    are removed when the total size goes over max_bytes.
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+    >>> c_cache = SqliteCache(path, max_bytes=300)
+    >>> c_cache.set("a", b"x" * 100)
+    >>> c_cache.set("b", b"y" * 100)
+    >>> len(c_cache.get("a"))
+    100
+    >>> c_cache.set("c", b"z" * 100)  # evicts b since a was used more recently
+    >>> "b" in c_cache, "a" in c_cache
+    (False, True)
+    >>> other = SqliteCache(path).namespaced("update_output")
+    >>> other.set("a", 1)
+    >>> other.get("a"), c_cache.get("a") == b"x" * 100
+    (1, True)
+    >>> other.invalidate()  # only the namespace
+    >>> len(other), len(c_cache)
+    (0, 2)
+    """
+
+    def __init__(
+        self,
+        path,  # type: str
+        max_bytes=512 * 1024 * 1024,  # type: Optional[int]
+        ttl=None,  # type: Optional[float]
+        namespace=None,  # type: Optional[str]
+        timer=time.time,
+    ):
+        """
+        :param path: the SQLite file (created if needed)
+        :param max_bytes: the maximum total size of the pickled values (None
+        for unlimited)
+        :param ttl: the number of seconds an entry stays valid (None for forever)
+        :param namespace: keeps the entries apart from other users of the file,
+        without one len, stats and invalidate cover every entry in the file
+        :param timer: the clock used for expiring entries and the LRU order
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.namespace = namespace
+        self._timer = timer
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def namespaced(self, namespace):
+        # type: (str) -> SqliteCache
+        """A cache for the same file with its own namespace"""
+        return SqliteCache(
+            self.path, self.max_bytes, self.ttl, namespace=namespace, timer=self._timer
+        )
+
+    def _conn(self):
+        # connections can not be shared by threads or (forked) processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, "
+                "value BLOB, size INTEGER, expires_at REAL, used_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _where(self, key=None):
+        if key is not None:
+            key = key if isinstance(key, str) else make_cache_key(key)
+            return " WHERE namespace = ? AND key = ?", [self.namespace or "", key]
+        if self.namespace is not None:
+            return " WHERE namespace = ?", [self.namespace]
+        return "", []
+
+    def _count(self, **counts):
+        with self._lock:
+            for c_name, c_value in counts.items():
+                setattr(self, c_name, getattr(self, c_name) + c_value)
+
+    def __len__(self):
+        where, params = self._where()
+        query = "SELECT COUNT(*) FROM entries" + where
+        return self._conn().execute(query, params).fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        """Get an entry and mark it as recently used (see ResultCache.get)"""
+        where, params = self._where(key)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at FROM entries" + where, params
+        ).fetchone()
+        if row is not None and (row[1] is None or row[1] > self._timer()):
+            conn.execute(
+                "UPDATE entries SET used_at = ?" + where, [self._timer()] + params
+            )
+            if count:
+                self._count(hits=1)
+            return pickle.loads(row[0])
+        if count:
+            self._count(misses=1)
+        return default
+
+    def set(self, key, value):
+        """Store an entry evicting the least recently used ones if needed"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = self._timer()
+        expires_at = None if self.ttl is None else now + self.ttl
+        key = key if isinstance(key, str) else make_cache_key(key)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace or "", key, blob, len(blob), expires_at, now),
+            )
+            if self.max_bytes is not None:
+                self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        # the size limit is shared by every namespace in the file
+        query = "SELECT COALESCE(SUM(size), 0) FROM entries"
+        total = conn.execute(query).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for namespace, key, size in conn.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY used_at"
+        ):
+            if total <= self.max_bytes:
+                break
+            evicted += [(namespace, key)]
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+        self._count(evictions=len(evicted))
+
+    def invalidate(self, key=None):
+        """Remove one key or (by default) every entry of the namespace"""
+        where, params = self._where(key)
+        self._conn().execute("DELETE FROM entries" + where, params)
+
+    def stats(self):
+        # type: () -> Dict[str, Any]
+        """The hit, miss and eviction counters of this process along with the
+        entries and bytes of the namespace (shared by the processes)"""
+        where, params = self._where()
+        query = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries" + where
+        size, n_bytes = self._conn().execute(query, params).fetchone()
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                size=size,
+                bytes=n_bytes,
+                max_bytes=self.max_bytes,
+                ttl=self.ttl,
+            )
+
+
+def resolve_cache(cache):
+    """Turns the cache argument of the callback decorators into a cache object.
+    :param cache: None/False for no cache, True for the default, an int for
+    the maximum size or an object with get/set/invalidate/stats methods
+    >>> resolve_cache(None) is None
+    True
+    >>> resolve_cache(5).max_size
+    5
+    >>> resolve_cache(True).max_size
+    128
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache()
+    if isinstance(cache, int):
+        return ResultCache(max_size=cache)
+    return cache
+
+
+def cache_callback(func, cache, name=None):
+    """Wrap a callback so results are looked up in the cache first.
+    :param func: the callback function
+    :param cache: the cache to store results in
+    :param name: the name used in the keys (defaults to the function name)
+    >>> calls = []
+    >>> def update_output(input_1):
+    ...     calls.append(input_1)
+    ...     return input_1 * 2
+    >>> c_func = cache_callback(update_output, ResultCache())
+    >>> c_func(2), c_func(2), c_func(3)
+    (4, 4, 6)
+    >>> calls
+    [2, 3]
+    """
+    key_name = name or getattr(func, "__name__", "")
+
+    @wraps(func)
+    def cached_func(*args):
+        key = make_cache_key(key_name, args)
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = func(*args)
+            cache.set(key, result)
+        return result
+
+    cached_func.cache = cache
+    return cached_func
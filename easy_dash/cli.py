@@ -0,0 +1,73 @@
+"""Command line tools, for example
+    easy-dash serve my_project.dashboard:app --workers 4 --threads 8
+"""
+from __future__ import print_function
+
+import argparse
+import importlib
+import os
+import sys
+
+
+def load_app(app_path):
+    """Import an app from a module:attribute string (attribute defaults to app)"""
+    module_name, _, attr_name = app_path.partition(":")
+    # like python -m, allow apps next to where the command is run
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    attr_name = attr_name or "app"
+    app = getattr(module, attr_name, None)
+    if app is None:
+        raise ValueError("{} has no attribute {}".format(module_name, attr_name))
+    if not hasattr(app, "serve"):
+        raise ValueError("{} is not an EasyDash app".format(app_path))
+    return app
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="easy-dash")
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser(
+        "serve", help="serve an app with several worker processes"
+    )
+    serve_parser.add_argument("app", help="module:attribute of the EasyDash app")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8050)
+    serve_parser.add_argument(
+        "--workers", type=int, default=None, help="processes (default one per core)"
+    )
+    serve_parser.add_argument(
+        "--threads", type=int, default=4, help="request threads per process"
+    )
+    serve_parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=0,
+        help="restart a worker after this many requests (0 never)",
+    )
+    serve_parser.add_argument("--graceful-timeout", type=float, default=30)
+    serve_parser.add_argument(
+        "--warm",
+        type=int,
+        default=0,
+        help="fill the callback caches with up to this many calls each (0 never)",
+    )
+    p_args = parser.parse_args(args)
+    if p_args.command != "serve":
+        parser.print_help()
+        return 1
+    load_app(p_args.app).serve(
+        host=p_args.host,
+        port=p_args.port,
+        workers=p_args.workers,
+        threads=p_args.threads,
+        max_requests=p_args.max_requests,
+        graceful_timeout=p_args.graceful_timeout,
+        warm=p_args.warm,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
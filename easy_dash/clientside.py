@@ -0,0 +1,400 @@
+"""Compile simple callbacks (pass-throughs, formatting, arithmetic) to JavaScript"""
+from __future__ import print_function
+
+import ast
+import inspect
+import json
+import string
+import textwrap
+
+# javascript versions of the python operations (raising TypeError where python
+# would) so the clientside callback behaves like the python one
+_JS_HELPERS = {
+    "str": """function(v) {
+        if (v === null || v === undefined) { return "None"; }
+        if (v === true) { return "True"; }
+        if (v === false) { return "False"; }
+        if (Array.isArray(v)) { return "[" + v.map(ez.repr).join(", ") + "]"; }
+        if (typeof v === "object") { throw new TypeError("cannot format objects"); }
+        return String(v);
+    }""",
+    "repr": """function(v) {
+        if (typeof v !== "string") { return ez.str(v); }
+        v = v.replace(/\\\\/g, "\\\\\\\\");
+        if (v.indexOf("'") >= 0 && v.indexOf('"') < 0) { return '"' + v + '"'; }
+        return "'" + v.replace(/'/g, "\\\\'") + "'";
+    }""",
+    "fstr": """function(v) {
+        if (typeof v !== "number") { return ez.str(v); }
+        if (isNaN(v)) { return "nan"; }
+        if (!isFinite(v)) { return v > 0 ? "inf" : "-inf"; }
+        var absv = Math.abs(v);
+        if (absv !== 0 && (absv < 1e-4 || absv >= 1e16)) {
+            return v.toExponential().replace(/e([+-])(\\d)$/, "e$10$2");
+        }
+        return Number.isInteger(v) ? v.toFixed(1) : String(v);
+    }""",
+    "bool": """function(v) {
+        if (v === null || v === undefined) { return false; }
+        if (Array.isArray(v) || typeof v === "string") { return v.length > 0; }
+        if (typeof v === "object") { return Object.keys(v).length > 0; }
+        return Boolean(v);
+    }""",
+    "num": """function(v) {
+        if (typeof v === "boolean") { return +v; }
+        if (typeof v !== "number") { throw new TypeError("unsupported operand"); }
+        return v;
+    }""",
+    "add": """function(a, b) {
+        if (typeof a === "string" && typeof b === "string") { return a + b; }
+        if (Array.isArray(a) && Array.isArray(b)) { return a.concat(b); }
+        return ez.num(a) + ez.num(b);
+    }""",
+    "mul": """function(a, b) {
+        if (typeof a === "string" && typeof b === "number") { return a.repeat(Math.max(b, 0)); }
+        if (typeof b === "string" && typeof a === "number") { return b.repeat(Math.max(a, 0)); }
+        return ez.num(a) * ez.num(b);
+    }""",
+    "div": """function(a, b) {
+        if (ez.num(b) === 0) { throw new RangeError("division by zero"); }
+        return ez.num(a) / b;
+    }""",
+    "floordiv": """function(a, b) { return Math.floor(ez.div(a, b)); }""",
+    "mod": """function(a, b) {
+        if (ez.num(b) === 0) { throw new RangeError("modulo by zero"); }
+        return ((ez.num(a) % b) + b) % b;
+    }""",
+    "eq": """function(a, b) {
+        if (typeof a === "object" || typeof b === "object") {
+            return JSON.stringify(a) === JSON.stringify(b);
+        }
+        if (typeof a === "boolean") { a = +a; }
+        if (typeof b === "boolean") { b = +b; }
+        return a === b;
+    }""",
+    "cmp": """function(a, b) {
+        if (typeof a !== typeof b || (typeof a !== "number" && typeof a !== "string")) {
+            throw new TypeError("unorderable types");
+        }
+        return a < b ? -1 : (a > b ? 1 : 0);
+    }""",
+    "len": """function(v) {
+        if (typeof v === "string" || Array.isArray(v)) { return v.length; }
+        throw new TypeError("object has no len()");
+    }""",
+    "float": """function(v) {
+        if (typeof v === "number") { return v; }
+        if (typeof v === "string" && /^\\s*[+-]?(\\d+\\.?\\d*|\\.\\d+)([eE][+-]?\\d+)?\\s*$/.test(v)) {
+            return parseFloat(v);
+        }
+        throw new TypeError("could not convert to float");
+    }""",
+    "int": """function(v) {
+        if (typeof v === "number") { return Math.trunc(v); }
+        if (typeof v === "string" && /^\\s*[+-]?\\d+\\s*$/.test(v)) { return parseInt(v, 10); }
+        throw new TypeError("invalid literal for int()");
+    }""",
+}
+# helpers which use other helpers
+_HELPER_DEPS = {
+    "str": ["repr"],
+    "fstr": ["str"],
+    "repr": ["str"],
+    "add": ["num"],
+    "mul": ["num"],
+    "div": ["num"],
+    "floordiv": ["div"],
+    "mod": ["num"],
+}
+_BIN_OPS = {
+    ast.Add: "add",
+    ast.Sub: None,
+    ast.Mult: "mul",
+    ast.Div: "div",
+    ast.FloorDiv: "floordiv",
+    ast.Mod: "mod",
+    ast.Pow: None,
+}
+_CMP_OPS = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+_STR_METHODS = {"upper": "toUpperCase", "lower": "toLowerCase", "strip": "trim"}
+
+
+class NotCompilable(ValueError):
+    """The callback uses something which has no clientside version"""
+
+
+class _Compiler(object):
+    def __init__(self, arg_names):
+        self.arg_names = {c_arg: "a{}".format(i) for i, c_arg in enumerate(arg_names)}
+        self.helpers = set()
+
+    def is_float(self, node):
+        # type: (ast.AST) -> bool
+        """If the expression is always a float (which python formats as 1.0)"""
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, float)
+        if isinstance(node, ast.Call):
+            return isinstance(node.func, ast.Name) and node.func.id == "float"
+        if isinstance(node, ast.BinOp):
+            return isinstance(node.op, ast.Div) or (
+                self.is_float(node.left) or self.is_float(node.right)
+            )
+        if isinstance(node, ast.UnaryOp):
+            return not isinstance(node.op, ast.Not) and self.is_float(node.operand)
+        if isinstance(node, ast.IfExp):
+            return self.is_float(node.body) and self.is_float(node.orelse)
+        return False
+
+    def to_str(self, node):
+        # type: (ast.AST) -> str
+        """The javascript for str(node)"""
+        return self.helper("fstr" if self.is_float(node) else "str", self.expr(node))
+
+    def helper(self, name, *js_args):
+        self.helpers.add(name)
+        return "ez.{}({})".format(name, ", ".join(js_args))
+
+    def expr(self, node):
+        # type: (ast.AST) -> str
+        if isinstance(node, ast.Name):
+            if node.id not in self.arg_names:
+                raise NotCompilable("uses the global or builtin {}".format(node.id))
+            return self.arg_names[node.id]
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (str, int, float, bool, type(None))):
+                raise NotCompilable("constant {!r}".format(node.value))
+            return json.dumps(node.value)
+        if isinstance(node, ast.Tuple) or isinstance(node, ast.List):
+            return "[{}]".format(", ".join(self.expr(c_elt) for c_elt in node.elts))
+        if isinstance(node, ast.BinOp):
+            return self.bin_op(node)
+        if isinstance(node, ast.UnaryOp):
+            operand = self.expr(node.operand)
+            if isinstance(node.op, ast.Not):
+                return "!{}".format(self.helper("bool", operand))
+            if isinstance(node.op, ast.USub):
+                return "(-{})".format(self.helper("num", operand))
+            if isinstance(node.op, ast.UAdd):
+                return self.helper("num", operand)
+        if isinstance(node, ast.BoolOp):
+            # python returns the deciding value (not a boolean)
+            values = [self.expr(c_val) for c_val in node.values]
+            out_js = values[-1]
+            for c_val in reversed(values[:-1]):
+                if isinstance(node.op, ast.And):
+                    out_js = "(function(v) {{ return {} ? {} : v; }})({})".format(
+                        self.helper("bool", "v"), out_js, c_val
+                    )
+                else:
+                    out_js = "(function(v) {{ return {} ? v : {}; }})({})".format(
+                        self.helper("bool", "v"), out_js, c_val
+                    )
+            return out_js
+        if isinstance(node, ast.IfExp):
+            return "({} ? {} : {})".format(
+                self.helper("bool", self.expr(node.test)),
+                self.expr(node.body),
+                self.expr(node.orelse),
+            )
+        if isinstance(node, ast.Compare):
+            return self.compare(node)
+        if isinstance(node, ast.JoinedStr):
+            return self.f_string(node)
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        raise NotCompilable("{} is not supported".format(type(node).__name__))
+
+    def bin_op(self, node):
+        left, right = self.expr(node.left), self.expr(node.right)
+        op_type = type(node.op)
+        if op_type not in _BIN_OPS:
+            raise NotCompilable("operator {}".format(op_type.__name__))
+        if op_type is ast.Sub:
+            return "({} - {})".format(
+                self.helper("num", left), self.helper("num", right)
+            )
+        if op_type is ast.Pow:
+            return "Math.pow({}, {})".format(
+                self.helper("num", left), self.helper("num", right)
+            )
+        return self.helper(_BIN_OPS[op_type], left, right)
+
+    def compare(self, node):
+        if len(node.ops) != 1:
+            raise NotCompilable("chained comparisons")
+        left, right = self.expr(node.left), self.expr(node.comparators[0])
+        c_op = node.ops[0]
+        if isinstance(c_op, ast.Eq):
+            return self.helper("eq", left, right)
+        if isinstance(c_op, ast.NotEq):
+            return "!{}".format(self.helper("eq", left, right))
+        if isinstance(c_op, ast.Is) or isinstance(c_op, ast.IsNot):
+            if not (
+                isinstance(node.comparators[0], ast.Constant)
+                and node.comparators[0].value is None
+            ):
+                raise NotCompilable("is only with None")
+            js_op = "==" if isinstance(c_op, ast.Is) else "!="
+            return "({} {} null)".format(left, js_op)
+        if type(c_op) in _CMP_OPS:
+            return "({} {} 0)".format(
+                self.helper("cmp", left, right), _CMP_OPS[type(c_op)]
+            )
+        raise NotCompilable("comparison {}".format(type(c_op).__name__))
+
+    def f_string(self, node):
+        parts = []
+        for c_val in node.values:
+            if isinstance(c_val, ast.Constant):
+                parts += [json.dumps(c_val.value)]
+            elif c_val.conversion not in (-1, ord("s")) or c_val.format_spec:
+                raise NotCompilable("format specs and conversions")
+            else:
+                parts += [self.to_str(c_val.value)]
+        return "({})".format(" + ".join(parts) or '""')
+
+    def str_format(self, template, args):
+        parts = []
+        arg_idx = 0
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if literal:
+                parts += [json.dumps(literal)]
+            if field is None:
+                continue
+            if spec or conversion or not (field == "" or field.isdigit()):
+                raise NotCompilable("format specs, conversions and named fields")
+            if field == "":
+                field_idx, arg_idx = arg_idx, arg_idx + 1
+            else:
+                field_idx = int(field)
+            if field_idx >= len(args):
+                raise NotCompilable("missing format argument")
+            parts += [self.to_str(args[field_idx])]
+        return "({})".format(" + ".join(parts) or '""')
+
+    def call(self, node):
+        if node.keywords:
+            raise NotCompilable("keyword arguments")
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            if (
+                func.attr == "format"
+                and isinstance(func.value, ast.Constant)
+                and isinstance(func.value.value, str)
+            ):
+                return self.str_format(func.value.value, node.args)
+            if func.attr in _STR_METHODS and not node.args:
+                return "{}.{}()".format(self.expr(func.value), _STR_METHODS[func.attr])
+            raise NotCompilable("method {}".format(func.attr))
+        if isinstance(func, ast.Name) and func.id not in self.arg_names:
+            if func.id == "str" and len(node.args) == 1:
+                return self.to_str(node.args[0])
+            if func.id in ("len", "float", "int", "bool") and len(node.args) == 1:
+                return self.helper(func.id, self.expr(node.args[0]))
+        func_name = func.id if isinstance(func, ast.Name) else type(func).__name__
+        raise NotCompilable("calls {}".format(func_name))
+
+    def helper_source(self):
+        # include the helpers the used helpers need
+        needed = set()
+        todo = list(self.helpers)
+        while todo:
+            c_name = todo.pop()
+            if c_name not in needed:
+                needed.add(c_name)
+                todo += _HELPER_DEPS.get(c_name, [])
+        return ",\n".join(
+            "        {}: {}".format(c_name, _JS_HELPERS[c_name])
+            for c_name in sorted(needed)
+        )
+
+
+def _is_auto_callback(decorator):
+    # type: (ast.expr) -> bool
+    """
+    >>> _is_auto_callback(ast.parse("app.auto_callback(clientside=True)").body[0].value)
+    True
+    >>> _is_auto_callback(ast.parse("lru_cache()").body[0].value)
+    False
+    """
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    if isinstance(decorator, ast.Attribute):
+        return decorator.attr == "auto_callback"
+    return isinstance(decorator, ast.Name) and decorator.id == "auto_callback"
+
+
+def compile_clientside(func):
+    # type: (Callable) -> str
+    """Compile a callback which only returns an expression of its arguments
+    into the source of a javascript function for Dash clientside callbacks.
+    :raises NotCompilable: with the reason it has to stay on the server
+    >>> def update_output1(input):
+    ...     return input
+    >>> print(compile_clientside(update_output1))
+    function(a0) {
+        return a0;
+    }
+    >>> def update_out(value_of_name):
+    ...     return "Hello {}!".format(value_of_name)
+    >>> print(compile_clientside(update_out).splitlines()[-2].strip())
+    return ("Hello " + ez.str(a0) + "!");
+    >>> def update_out(value_of_name):
+    ...     return sorted(value_of_name)
+    >>> compile_clientside(update_out)
+    Traceback (most recent call last):
+    ...
+    easy_dash.clientside.NotCompilable: calls sorted
+    >>> from functools import wraps
+    >>> def shout(func):
+    ...     @wraps(func)
+    ...     def shouted(*args):
+    ...         return func(*args).upper()
+    ...     return shouted
+    >>> @shout
+    ... def update_out(value_of_name):
+    ...     return value_of_name
+    >>> compile_clientside(update_out)
+    Traceback (most recent call last):
+    ...
+    easy_dash.clientside.NotCompilable: wrapped by a decorator
+    """
+    if inspect.iscoroutinefunction(func):
+        raise NotCompilable("async function")
+    if hasattr(func, "__wrapped__"):
+        # getsource would read the source of the inner function
+        raise NotCompilable("wrapped by a decorator")
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+    except (OSError, TypeError):
+        raise NotCompilable("source code is not available")
+    func_def = ast.parse(source).body[0]
+    if not isinstance(func_def, ast.FunctionDef):
+        raise NotCompilable("not a function definition")
+    if not all(_is_auto_callback(c_dec) for c_dec in func_def.decorator_list):
+        raise NotCompilable("decorated with something else than auto_callback")
+    f_args = func_def.args
+    if f_args.vararg or f_args.kwarg or f_args.kwonlyargs or f_args.defaults:
+        raise NotCompilable("variable, keyword only or default arguments")
+    body = func_def.body
+    if (
+        body
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    ):
+        body = body[1:]  # docstring
+    if len(body) != 1 or not isinstance(body[0], ast.Return) or body[0].value is None:
+        raise NotCompilable("the body is more than one return statement")
+    # guess_io_args makes every argument after the first state_ a state, so
+    # dash passes the values in the order of the arguments
+    arg_names = [c_arg.arg for c_arg in f_args.args]
+    compiler = _Compiler(arg_names)
+    return_js = compiler.expr(body[0].value)
+    lines = [
+        "function({}) {{".format(", ".join(compiler.arg_names[c] for c in arg_names))
+    ]
+    if compiler.helpers:
+        lines += ["    var ez = {", compiler.helper_source(), "    };"]
+    lines += ["    return {};".format(return_js), "}"]
+    return "\n".join(lines)
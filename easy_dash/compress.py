@@ -0,0 +1,190 @@
+"""Negotiated gzip and brotli compression tuned for callback responses"""
+from __future__ import print_function
+
+import gzip
+import hashlib
+import threading
+
+import flask
+
+from .cache import ResultCache
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/x-javascript",
+    "image/svg+xml",
+)
+_DATA_URI = b'"data:image/'
+
+
+def image_fraction(body):
+    # type: (bytes) -> float
+    """The fraction of a (json) body which is base64 image data URIs, they are
+    already compressed (png, jpeg, webp) so compressing them again is wasted
+    >>> image_fraction(b'{"src": "data:image/png;base64,AAAA", "id": "a"}')
+    0.5625
+    """
+    n_image = 0
+    start = body.find(_DATA_URI)
+    while start >= 0:
+        end = body.find(b'"', start + 1)
+        end = len(body) if end < 0 else end
+        n_image += end - start
+        start = body.find(_DATA_URI, end + 1)
+    return n_image / float(max(len(body), 1))
+
+
+def compress_bytes(data, encoding, level):
+    # type: (bytes, str, int) -> bytes
+    """
+    >>> gzip.decompress(compress_bytes(b"abc" * 100, "gzip", 6)) == b"abc" * 100
+    True
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output the same for the same input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class ResponseCompressor(object):
+    """An after_request hook which compresses responses with the best encoding
+    the browser accepts (brotli when installed, then gzip). The responses to
+    GET requests (index, layout, dependencies, assets and component suites)
+    are the same for every user, so their compressed copies are cached.
+    :param min_size: bytes below which compressing is not worth it
+    :param gzip_level: gzip level (1-9) for callback responses
+    :param brotli_level: brotli quality (0-11) for callback responses
+    :param static_level: gzip level / brotli quality for the cached copies
+    :param max_image_fraction: skip bodies which are mostly image data URIs
+    :param static_cache: a ResultCache for the compressed copies
+    """
+
+    def __init__(
+        self,
+        min_size=500,
+        gzip_level=6,
+        brotli_level=4,
+        static_level=9,
+        max_image_fraction=0.5,
+        static_cache=None,
+    ):
+        self.min_size = min_size
+        self.levels = dict(gzip=gzip_level, br=brotli_level)
+        self.static_level = static_level
+        self.max_image_fraction = max_image_fraction
+        self.static_cache = (
+            ResultCache(max_size=128) if static_cache is None else static_cache
+        )
+        self.encodings = ["gzip"] if brotli is None else ["br", "gzip"]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._responses = {c_enc: 0 for c_enc in self.encodings}
+            self._skipped = dict(small=0, images=0, incompressible=0)
+            self._bytes_in = 0
+            self._bytes_out = 0
+            self._cache_hits = 0
+
+    def _count(self, encoding=None, skipped=None, bytes_in=0, bytes_out=0, hit=False):
+        with self._lock:
+            if encoding is not None:
+                self._responses[encoding] += 1
+            if skipped is not None:
+                self._skipped[skipped] += 1
+            self._bytes_in += bytes_in
+            self._bytes_out += bytes_out
+            self._cache_hits += int(hit)
+
+    def _static_copy(self, data, encoding, etag):
+        key = (encoding, etag or hashlib.sha1(data).hexdigest())
+        compressed = self.static_cache.get(key)
+        if compressed is not None:
+            return compressed, True
+        compressed = compress_bytes(data, encoding, self.static_level)
+        self.static_cache.set(key, compressed)
+        return compressed, False
+
+    def __call__(self, response):
+        if (
+            response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = flask.request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        # files (assets) are read so they can be compressed
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < self.min_size:
+            self._count(skipped="small")
+            return response
+        if image_fraction(data) > self.max_image_fraction:
+            self._count(skipped="images")
+            return response
+        etag, weak = response.get_etag()
+        hit = False
+        if flask.request.method == "GET":
+            compressed, hit = self._static_copy(data, encoding, etag)
+        else:
+            compressed = compress_bytes(data, encoding, self.levels[encoding])
+        if len(compressed) >= len(data):
+            self._count(skipped="incompressible")
+            return response
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag is not None:
+            response.set_etag("{}-{}".format(etag, encoding), weak=weak)
+        self._count(encoding, bytes_in=len(data), bytes_out=len(compressed), hit=hit)
+        return response
+
+    def stats(self):
+        # type: () -> Dict[str, Any]
+        """The compressed and skipped responses and the bytes saved"""
+        with self._lock:
+            return dict(
+                responses=dict(self._responses),
+                skipped=dict(self._skipped),
+                bytes_in=self._bytes_in,
+                bytes_out=self._bytes_out,
+                bytes_saved=self._bytes_in - self._bytes_out,
+                cache_hits=self._cache_hits,
+            )
+
+    def to_prometheus(self):
+        # type: () -> str
+        """The counters in the Prometheus text exposition format"""
+        c_stats = self.stats()
+        lines = [
+            "# HELP easydash_compressed_responses_total Compressed responses",
+            "# TYPE easydash_compressed_responses_total counter",
+        ]
+        lines += [
+            'easydash_compressed_responses_total{{encoding="{}"}} {}'.format(*c_row)
+            for c_row in sorted(c_stats["responses"].items())
+        ]
+        lines += [
+            "# HELP easydash_uncompressed_responses_total Responses not compressed",
+            "# TYPE easydash_uncompressed_responses_total counter",
+        ]
+        lines += [
+            'easydash_uncompressed_responses_total{{reason="{}"}} {}'.format(*c_row)
+            for c_row in sorted(c_stats["skipped"].items())
+        ]
+        lines += [
+            "# HELP easydash_compression_bytes_saved_total Bytes saved by compression",
+            "# TYPE easydash_compression_bytes_saved_total counter",
+            "easydash_compression_bytes_saved_total {}".format(c_stats["bytes_saved"]),
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,356 @@
+"""Reduce large line and scatter traces to about as many points as pixels"""
+from __future__ import print_function
+
+import base64
+import copy
+import hashlib
+from functools import wraps
+
+import dash_core_components as dcc
+import numpy as np
+from dash import callback_context, no_update
+from dash.dependencies import Input
+from dash.exceptions import PreventUpdate
+
+from .cache import ResultCache, make_cache_key
+
+DEFAULT_WIDTH = 1000  # the plot width (in pixels) when the layout has none
+# arrays which have a value for every point
+_POINT_ARRAYS = [
+    ("text",),
+    ("hovertext",),
+    ("customdata",),
+    ("ids",),
+    ("marker", "color"),
+    ("marker", "size"),
+    ("marker", "symbol"),
+]
+
+
+def minmax_indices(x, y, n_buckets):
+    # type: (np.ndarray, np.ndarray, int) -> np.ndarray
+    """The first, last, minimum and maximum point of each of n_buckets equally
+    wide x ranges (x must be sorted), this keeps every peak of a line
+    >>> x = np.arange(12)
+    >>> y = np.array([0, 5, 1, 2, 3, -4, 1, 1, 9, 1, 1, 0])
+    >>> minmax_indices(x, y, 3).tolist()
+    [0, 1, 4, 5, 8, 11]
+    """
+    n_points = len(y)
+    if n_points <= 2 * n_buckets + 2:
+        return np.arange(n_points)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)[:-1]
+    starts = np.unique(np.searchsorted(x, edges, side="left"))
+    starts = starts[starts < n_points]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n_points)))
+    keep = [np.array([0, n_points - 1])]
+    nans = np.isnan(y)
+    for ext_func, fill_value in [(np.minimum, np.inf), (np.maximum, -np.inf)]:
+        values = np.where(nans, fill_value, y)
+        bucket_ext = ext_func.reduceat(values, starts)
+        hits = np.flatnonzero(values == bucket_ext[bucket])
+        _, first_hit = np.unique(bucket[hits], return_index=True)
+        keep += [hits[first_hit]]
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, y, n_out):
+    # type: (np.ndarray, np.ndarray, int) -> np.ndarray
+    """Largest-Triangle-Three-Buckets, n_out points which keep the shape of
+    the line (the buckets are a loop, each one is vectorized)
+    >>> x = np.arange(10)
+    >>> lttb_indices(x, np.array([0, 0, 9, 0, 0, 0, 0, -9, 0, 0]), 4).tolist()
+    [0, 2, 7, 9]
+    """
+    n_points = len(x)
+    if n_out >= n_points or n_out < 3:
+        return np.arange(n_points)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n_points - 1, n_out - 1).astype(int)
+    # the average point of every bucket (the last bucket is the last point)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / np.diff(edges), x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / np.diff(edges), y[-1])
+    out_idx = np.empty(n_out, dtype=int)
+    out_idx[0], out_idx[-1] = 0, n_points - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[prev] - avg_x[i + 1]) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y[i + 1] - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        out_idx[i + 1] = prev
+    return out_idx
+
+
+def _get_path(trace, path):
+    for key in path:
+        if not isinstance(trace, dict) or key not in trace:
+            return None
+        trace = trace[key]
+    return trace
+
+
+def _set_path(trace, path, value):
+    for key in path[:-1]:
+        trace = trace[key]
+    trace[path[-1]] = value
+
+
+def decimate_trace(trace, n_target, method="minmax", x_range=None):
+    # type: (Dict[str, Any], int, str, Optional[Tuple[float, float]]) -> Optional[Dict]
+    """A copy of a scatter trace with about two points for each of n_target
+    pixel columns (of x_range if given) or None if the trace does not need (or
+    support) decimation"""
+    if trace.get("type", "scatter") not in ("scatter", "scattergl"):
+        return None
+    if trace.get("y") is None:
+        return None
+    y = np.asarray(trace["y"])
+    x = np.arange(len(y)) if trace.get("x") is None else np.asarray(trace["x"])
+    if x.dtype.kind not in "iuf" or y.dtype.kind not in "iufb" or len(x) != len(y):
+        return None  # dates, categories, ...
+    order = None
+    if len(x) > 1 and np.any(np.diff(x) < 0):
+        if "lines" in trace.get("mode", "lines"):
+            return None  # the order of the points matters
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+    lo_idx, hi_idx = 0, len(x)
+    if x_range is not None:
+        lo_range, hi_range = sorted(x_range)
+        # one point outside of the range on each side so lines reach the edges
+        lo_idx = max(np.searchsorted(x, lo_range, side="left") - 1, 0)
+        hi_idx = min(np.searchsorted(x, hi_range, side="right") + 1, len(x))
+    if x_range is None and len(x) <= 2 * n_target:
+        return None
+    if method == "lttb":
+        keep = lttb_indices(x[lo_idx:hi_idx], y[lo_idx:hi_idx], 2 * n_target)
+    elif method == "minmax":
+        keep = minmax_indices(x[lo_idx:hi_idx], y[lo_idx:hi_idx], n_target)
+    else:
+        raise ValueError("method must be minmax or lttb not {}".format(method))
+    keep = keep + lo_idx
+    point_idx = keep if order is None else order[keep]
+    out_trace = copy.copy(trace)
+    out_trace["x"], out_trace["y"] = x[keep], y[keep]
+    for path in _POINT_ARRAYS:
+        values = _get_path(trace, path)
+        if values is not None and not isinstance(values, str) and np.ndim(values) > 0:
+            if len(values) == len(y):
+                if path[0] == "marker":
+                    out_trace["marker"] = dict(out_trace["marker"])
+                _set_path(out_trace, path, np.asarray(values)[point_idx])
+    return out_trace
+
+
+def _decode_arrays(value):
+    """Turn the base64 typed arrays of plotly (>= 6) back into numpy arrays
+    >>> _decode_arrays(dict(x=dict(dtype="i1", bdata="AQID")))
+    {'x': array([1, 2, 3], dtype=int8)}
+    """
+    if isinstance(value, dict):
+        if "bdata" in value and "dtype" in value:
+            array = np.frombuffer(base64.b64decode(value["bdata"]), value["dtype"])
+            if "shape" in value:  # "rows, columns"
+                array = array.reshape(
+                    [int(c_dim) for c_dim in value["shape"].split(",")]
+                )
+            return array
+        return {c_key: _decode_arrays(c_value) for c_key, c_value in value.items()}
+    if isinstance(value, list):
+        return [_decode_arrays(c_value) for c_value in value]
+    return value
+
+
+def figure_dict(figure):
+    # type: (Any) -> Dict[str, Any]
+    """A (shallow) dictionary of a figure dict or plotly Figure"""
+    if hasattr(figure, "to_dict"):
+        figure = _decode_arrays(figure.to_dict())
+    return dict(
+        figure, data=list(figure.get("data", [])), layout=dict(figure.get("layout", {}))
+    )
+
+
+def _x_axis_name(trace):
+    # "x2" -> "xaxis2"
+    return "xaxis" + trace.get("xaxis", "x")[1:]
+
+
+def decimate_figure(figure, max_points=None, method="minmax", x_ranges=None):
+    """Decimate the large line and scatter traces of a figure.
+    :param figure: a figure dict (or plotly Figure)
+    :param max_points: the pixel columns of a trace (about two points are kept
+    for each), default is the width of the plot
+    :param method: minmax (keeps every peak) or lttb (keeps the shape)
+    :param x_ranges: the visible range by axis name (xaxis, xaxis2, ...) to
+    decimate at full resolution when zoomed in
+    :return: the new figure (a dict) and if any trace was decimated
+    >>> x = np.linspace(0, 1, 10000)
+    >>> fig = dict(data=[dict(type="scatter", x=x, y=np.sin(50 * x))])
+    >>> small_fig, changed = decimate_figure(fig, max_points=100)
+    >>> changed, len(small_fig["data"][0]["x"]) <= 202
+    (True, True)
+    >>> zoom_fig, _ = decimate_figure(fig, 100, x_ranges={"xaxis": (0.5, 0.51)})
+    >>> len(zoom_fig["data"][0]["x"])
+    102
+    """
+    out_fig = figure_dict(figure)
+    if max_points is None:
+        max_points = int(out_fig["layout"].get("width") or DEFAULT_WIDTH)
+    x_ranges = x_ranges or {}
+    changed = False
+    for i, c_trace in enumerate(out_fig["data"]):
+        if hasattr(c_trace, "to_plotly_json"):
+            c_trace = c_trace.to_plotly_json()
+        x_range = x_ranges.get(_x_axis_name(c_trace))
+        new_trace = decimate_trace(c_trace, max_points, method=method, x_range=x_range)
+        if new_trace is not None:
+            out_fig["data"][i] = new_trace
+            changed = True
+    return out_fig, changed
+
+
+def relayout_x_ranges(relayout_data):
+    # type: (Optional[Dict[str, Any]]) -> Dict[str, Optional[Tuple[float, float]]]
+    """The x ranges which changed in the relayoutData of a dcc.Graph (None
+    means back to the full range)
+    >>> relayout_x_ranges({"xaxis.range[0]": 1, "xaxis.range[1]": 2.5})
+    {'xaxis': (1, 2.5)}
+    >>> relayout_x_ranges({"xaxis2.autorange": True, "autosize": True})
+    {'xaxis2': None}
+    """
+    x_ranges = {}
+    for key, value in (relayout_data or {}).items():
+        axis_name, _, prop = key.partition(".")
+        if not axis_name.startswith("xaxis"):
+            continue
+        if prop == "autorange":
+            x_ranges[axis_name] = None
+        elif prop == "range":
+            x_ranges[axis_name] = (value[0], value[1])
+        elif prop == "range[0]" and axis_name + ".range[1]" in relayout_data:
+            x_ranges[axis_name] = (value, relayout_data[axis_name + ".range[1]"])
+    return x_ranges
+
+
+def _is_figure(value):
+    if isinstance(value, dict):
+        return "data" in value
+    return hasattr(value, "to_dict") and hasattr(value, "data")
+
+
+def decimate_output(value, max_points=None, method="minmax"):
+    """Decimate a figure or the figure of a dcc.Graph (anything else is
+    returned as it is)"""
+    if isinstance(value, dcc.Graph) and _is_figure(getattr(value, "figure", None)):
+        small_fig, changed = decimate_figure(value.figure, max_points, method)
+        if changed:
+            value = copy.copy(value)
+            value.figure = small_fig
+        return value
+    if _is_figure(value):
+        return decimate_figure(value, max_points, method)[0]
+    return value
+
+
+_NOT_DECIMATED = object()  # kept instead of full figures which were small enough
+
+
+def decimate_callback(func, name, outputs, n_inputs, max_points=None, method="minmax"):
+    """Wrap a callback so its figures are decimated and figure outputs are
+    decimated again at full resolution for the visible range when zoomed.
+    The wrapped callback takes the relayoutData of every figure output after
+    the n_inputs inputs of func (see relayout_inputs). The full figures are
+    kept by input values, so a zoom after they were evicted calls func again.
+    Zooming into figures which were sent in full does not update them.
+    """
+    graph_idx = [
+        i for i, c_out in enumerate(outputs) if c_out.component_property == "figure"
+    ]
+    relayout_props = {
+        "{}.relayoutData".format(outputs[c_idx].component_id): j
+        for j, c_idx in enumerate(graph_idx)
+    }
+    full_figures = ResultCache(max_size=64)
+
+    def to_list(result):
+        return list(result) if len(outputs) > 1 else [result]
+
+    def from_list(results):
+        return results if len(outputs) > 1 else results[0]
+
+    def full_figure(key, user_args, out_idx):
+        full_fig = full_figures.get((key, out_idx))
+        if full_fig is None:
+            c_val = to_list(func(*user_args))[out_idx]
+            if not _is_figure(c_val):
+                return None
+            full_fig = figure_dict(c_val)
+            if not decimate_figure(full_fig, max_points, method)[1]:
+                full_fig = _NOT_DECIMATED
+            full_figures.set((key, out_idx), full_fig)
+        return None if full_fig is _NOT_DECIMATED else full_fig
+
+    def decimate_results(key, results):
+        out_results = []
+        for i, c_val in enumerate(results):
+            if i in graph_idx and _is_figure(c_val):
+                full_fig = figure_dict(c_val)
+                c_val, changed = decimate_figure(full_fig, max_points, method)
+                full_figures.set((key, i), full_fig if changed else _NOT_DECIMATED)
+                if changed:
+                    # the zoom of the user survives the zoom updates
+                    c_val["layout"]["uirevision"] = key
+            else:
+                c_val = decimate_output(c_val, max_points, method)
+            out_results += [c_val]
+        return out_results
+
+    def zoom_results(key, user_args, relayouts, zoomed):
+        out_results = [no_update] * len(outputs)
+        for j in zoomed:
+            x_ranges = relayout_x_ranges(relayouts[j])
+            if not x_ranges:
+                continue  # autosize, dragmode, ...
+            full_fig = full_figure(key, user_args, graph_idx[j])
+            if full_fig is None:
+                continue
+            small_fig, changed = decimate_figure(
+                full_fig, max_points, method, x_ranges=x_ranges
+            )
+            if changed:
+                small_fig["layout"]["uirevision"] = key
+                out_results[graph_idx[j]] = small_fig
+        if all(c_val is no_update for c_val in out_results):
+            raise PreventUpdate
+        return out_results
+
+    @wraps(func)
+    def decimated_func(*args):
+        n_graphs = len(graph_idx)
+        user_args = args[:n_inputs] + args[n_inputs + n_graphs :]
+        relayouts = args[n_inputs : n_inputs + n_graphs]
+        key = hashlib.sha1(make_cache_key(name, user_args).encode("utf8")).hexdigest()
+        triggered = [c_trig["prop_id"] for c_trig in callback_context.triggered]
+        zoomed = [
+            relayout_props[c_prop] for c_prop in triggered if c_prop in relayout_props
+        ]
+        if zoomed and len(zoomed) == len(triggered):
+            return from_list(zoom_results(key, user_args, relayouts, zoomed))
+        return from_list(decimate_results(key, to_list(func(*user_args))))
+
+    return decimated_func
+
+
+def relayout_inputs(outputs):
+    """The relayoutData inputs decimate_callback needs for the outputs"""
+    return [
+        Input(c_out.component_id, "relayoutData")
+        for c_out in outputs
+        if c_out.component_property == "figure"
+    ]
@@ -3,19 +3,45 @@ from __future__ import print_function
 
 import inspect
 import os
-from functools import wraps
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 
-import dash_html_components as html
-import dash_core_components as dcc
-import plotly.tools as tls
+import flask
+from dash import callback_context, no_update
 from dash.dash import Dash
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
-from .viz import fig_to_uri
+from .aio import as_sync
+from .cache import (
+    ResultCache,
+    SqliteCache,
+    cache_callback,
+    make_cache_key,
+    resolve_cache,
+)
+from .clientside import NotCompilable, compile_clientside
+from .compress import ResponseCompressor
+from .flow import coalesce_callback, page_callback
+from .images import IMAGE_ROUTE, TILE_ROUTE, ImageStore
+from .jobs import JobQueue
+from .layout import LayoutIndex, input_combinations, validate_callbacks
+from .metrics import METRICS_ROUTE, CallbackMetrics
+from .serve import PreforkServer
 
+# matplotlib, PIL, plotly and the component libraries are imported by the
+# functions which use them, so apps without mpl_callback start faster
 
-def guess_io_args(func):
+
+def guess_io_args(func, layout_ids=None):
     """Guesses the callback arguments from the signature.
+    :param func: the callback function
+    :param layout_ids: the ids of the layout (a LayoutIndex), a name joined
+    with _and_ is only split into several outputs when each part is one of
+    them (None always splits it)
     >>> def update_src_of_output_5(arg_of_input): pass
     >>> guess_io_args(update_src_of_output_5)
     (<Output `output_5.src`>, [<Input `input.arg`>], [])
@@ -25,6 +51,15 @@ def guess_io_args(func):
     >>> def update_output_dan(state_bob_3): pass
     >>> guess_io_args(update_output_dan)
     (<Output `output_dan.children`>, [], [<State `bob_3.value`>])
+    >>> def update_output1_and_figure_of_graph(inp): pass
+    >>> guess_io_args(update_output1_and_figure_of_graph)[0]
+    [<Output `output1.children`>, <Output `graph.figure`>]
+    >>> def update_rock_and_roll(inp): pass
+    >>> guess_io_args(update_rock_and_roll, layout_ids=["rock_and_roll"])[0]
+    <Output `rock_and_roll.children`>
+    >>> def update_extendData_of_graph(n_intervals_of_interval): pass
+    >>> guess_io_args(update_extendData_of_graph)
+    (<Output `graph.extendData`>, [<Input `interval.n_intervals`>], [])
     """
     valid_prefix_names = ["update_", "callback_"]
 
@@ -41,6 +76,18 @@ def guess_io_args(func):
         callback_name = getattr(callback_func, "__name__", "")
         comp_prop_start_idx = check_prefix(callback_name)
         comp_prop_name = callback_name[comp_prop_start_idx:]
+        outputs = [
+            process_single_output(c_name) for c_name in comp_prop_name.split("_and_")
+        ]
+        if len(outputs) > 1 and (
+            layout_ids is None
+            or all(c_out.component_id in layout_ids for c_out in outputs)
+        ):
+            # several outputs, the function returns a value for each of them
+            return outputs
+        return process_single_output(comp_prop_name)
+
+    def process_single_output(comp_prop_name):
         property_start = comp_prop_name.rfind("_of_")
         if property_start >= 1:
             comp_name = comp_prop_name[property_start + 4 :]
@@ -91,12 +138,604 @@ def guess_io_args(func):
     return output, inputs, states
 
 
+def _callback_id(output):
+    """The output string dash uses for the callback in requests
+    >>> _callback_id(Output("out", "children"))
+    'out.children'
+    >>> _callback_id([Output("out", "children"), Output("fig", "figure")])
+    '..out.children...fig.figure..'
+    """
+    if isinstance(output, list):
+        return "..{}..".format("...".join(_callback_id(c_out) for c_out in output))
+    return "{}.{}".format(output.component_id, output.component_property)
+
+
+def _decimate_points(decimate):
+    # True uses the width of the plot
+    return None if decimate is True else int(decimate)
+
+
+def _decimate_result(result, decimate, method="minmax"):
+    """Decimate the figures of a callback result (without zoom updates)"""
+    from .decimate import decimate_output
+
+    max_points = _decimate_points(decimate)
+    if isinstance(result, (list, tuple)):
+        return [decimate_output(c_out, max_points, method) for c_out in result]
+    return decimate_output(result, max_points, method)
+
+
+def _image_srcs(result):
+    """The src of the images in a callback result (one or several outputs)"""
+    if isinstance(result, (list, tuple)):
+        return [c_src for c_out in result for c_src in _image_srcs(c_out)]
+    src = getattr(result, "src", None)
+    return [src] if isinstance(src, str) else []
+
+
+def _progress_component(progress=None, message=None):
+    """The placeholder shown while a background job runs"""
+    import dash_html_components as html
+
+    if progress is None:
+        bar = html.Progress()
+    else:
+        bar = html.Progress(value=progress, max=1)
+    return html.Div([bar, html.Span(message or "Working...")])
+
+
 class EasyDash(Dash):
     """Wraps Dash apps and adds useful functions"""
 
-    def auto_callback(self, debug=False):
+    def __init__(self, *args, **kwargs):
+        """
+        Takes the arguments of Dash and
+        :param auto_clientside: move the auto callbacks which only return a
+        simple expression of their arguments to the browser (see auto_callback)
+        :param compress: compress the responses with gzip or brotli (True, a
+        ResponseCompressor with other settings or False)
+        :param image_cache: where the images served by URL are kept, a
+        SqliteCache shares them between the worker processes
+        """
+        self.auto_clientside = kwargs.pop("auto_clientside", False)
+        compress = kwargs.pop("compress", True)
+        if compress is True:
+            compress = ResponseCompressor()
+        self.compressor = compress or None  # type: Optional[ResponseCompressor]
+        # replaces the flask-compress setup of Dash
+        kwargs["compress"] = False
+        self._clientside_report = dict(clientside=[], server={})
+        image_cache = kwargs.pop("image_cache", None)
+        if isinstance(image_cache, SqliteCache) and image_cache.namespace is None:
+            image_cache = image_cache.namespaced("images")
+        self.image_store = ImageStore(image_cache)
+        self.metrics = CallbackMetrics()
+        self._callback_names = {}  # type: Dict[str, str]
+        self._background_components = []  # type: List[Any]
+        self._wrapped_layout = None  # type: Optional[Tuple[Any, Any]]
+        super(EasyDash, self).__init__(*args, **kwargs)
+        self._callback_caches = {}  # type: Dict[str, Any]
+        self._warmable = {}  # type: Dict[str, Tuple[List, List, Callable, bool]]
+        self._renderers = {}  # type: Dict[Any, Any]
+        self._pyramids = {}  # type: Dict[str, Any]
+        self._auto_callbacks = []  # type: List[Tuple[str, List, List, List]]
+        self._layout_index = None  # type: Optional[Tuple[Any, LayoutIndex]]
+        self._worker_hooks = []  # type: List[Callable[[], None]]
+        self._job_queues = {}  # type: Dict[str, JobQueue]
+
+    def init_app(self, app=None):
+        super(EasyDash, self).init_app(app)
+        self._add_url(IMAGE_ROUTE + "<string:img_key>", self.image_store.serve)
+        self._add_url(
+            TILE_ROUTE + "<string:name>/<string:token>/<int:level>/<int:row>/<int:col>",
+            self._serve_tile,
+        )
+        self._add_url(METRICS_ROUTE, self._serve_metrics)
+        if self.compressor is not None:
+            # the hooks run in reverse, so the payloads are recorded uncompressed
+            self.server.after_request(self.compressor)
+        self.server.after_request(self._record_payload)
+
+    def _serve_metrics(self):
+        text = self.metrics.to_prometheus()
+        if self.compressor is not None:
+            text += self.compressor.to_prometheus()
+        return flask.Response(text, content_type="text/plain; version=0.0.4")
+
+    def compression_stats(self):
+        # type: () -> Optional[Dict[str, Any]]
+        """The compressed and skipped responses and the bytes saved"""
+        if self.compressor is None:
+            return None
+        return self.compressor.stats()
+
+    def _record_payload(self, response):
+        """Adds the response size to the metrics of the callback"""
+        update_endpoint = self.config.routes_pathname_prefix + "_dash-update-component"
+        if flask.request.endpoint == update_endpoint:
+            body = flask.request.get_json(silent=True) or {}
+            name = self._callback_names.get(body.get("output"))
+            n_bytes = response.calculate_content_length()
+            if name is not None and n_bytes is not None:
+                self.metrics.observe_payload(name, n_bytes)
+        return response
+
+    def tile_viewer(self, name, in_array, width="100%", height=600, **pyramid_args):
+        """A pan and zoom viewer for a large 2D array which only loads the
+        tiles that are visible at the current zoom level.
+        :param name: the name of the viewer (also used in the tile URLs)
+        :param in_array: the 2D array (or memmap, h5py dataset, ...)
+        :param width: the width of the viewer
+        :param height: the height of the viewer
+        :param pyramid_args: tile_size, cmap, do_norm, encoder (see TilePyramid)
+        :return: a component to put in the layout
+        """
+        import dash_html_components as html
+
+        from .tiles import TilePyramid, viewer_html
+
+        pyramid = TilePyramid(in_array, **pyramid_args)
+        self._pyramids[name] = pyramid
+        tile_url = "{}{}{}/{}/".format(
+            self.config.requests_pathname_prefix, TILE_ROUTE, name, pyramid.token
+        )
+        return html.Iframe(
+            id=name,
+            srcDoc=viewer_html(pyramid.viewer_config(tile_url)),
+            style=dict(width=width, height=height, border="none"),
+        )
+
+    def _serve_tile(self, name, token, level, row, col):
+        pyramid = self._pyramids.get(name)
+        if pyramid is None or pyramid.token != token:
+            flask.abort(404)
+        img_bytes = pyramid.tile(level, row, col)
+        if img_bytes is None:
+            flask.abort(404)
+        response = flask.Response(img_bytes, mimetype=pyramid.encoder.mimetype)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+    def image_url(self, img_bytes, mimetype="image/png"):
+        # type: (bytes, str) -> str
+        """Store an encoded image and return the URL it is served from"""
+        img_key = self.image_store.add(img_bytes, mimetype)
+        return "{}{}{}".format(
+            self.config.requests_pathname_prefix, IMAGE_ROUTE, img_key
+        )
+
+    def _keep_images(self, cached_func, name):
+        """Wraps a cached callback returning images served by URL, every hit
+        marks its images as used so the image store does not evict the images
+        of results which are still served (they are rendered again if it did)"""
+        prefix = "{}{}".format(self.config.requests_pathname_prefix, IMAGE_ROUTE)
+
+        @wraps(cached_func)
+        def images_func(*args):
+            result = cached_func(*args)
+            img_keys = [
+                c_src[len(prefix) :]
+                for c_src in _image_srcs(result)
+                if c_src.startswith(prefix)
+            ]
+            if all([self.image_store.touch(c_key) for c_key in img_keys]):
+                return result
+            cached_func.cache.invalidate(make_cache_key(name, args))
+            return cached_func(*args)
+
+        return images_func
+
+    def _add_cache(self, func, cache, name=None, io_func=None, serial=False):
+        """Wraps func with a result cache (if requested) and registers it
+        :param io_func: the decorated function, its inputs are used to warm
+        the cache
+        :param serial: warm the cache one call at a time (pyplot figures)
+        """
+        cache = resolve_cache(cache)
+        if cache is None:
+            return func
+        name = name or func.__name__
+        if isinstance(cache, SqliteCache) and cache.namespace is None:
+            # one file can be shared by every callback (and invalidated apart)
+            cache = cache.namespaced(name)
+        self._callback_caches[name] = cache
+        cached_func = cache_callback(func, cache, name=name)
+        if io_func is not None:
+            _, inputs, states = self._guess_io_args(io_func)
+            self._warmable[name] = (inputs, states, cached_func, serial)
+        return cached_func
+
+    def _warm_calls(self, name, cached_func, arg_list):
+        for c_args in arg_list:
+            try:
+                with self.server.app_context():
+                    cached_func(*c_args)
+            except PreventUpdate:
+                pass
+            except Exception as error:
+                print(
+                    "Warming {} with {} failed: {!r}".format(name, c_args, error),
+                    file=sys.stderr,
+                )
+
+    def warm(self, names=None, budget=100, workers=4, wait=False):
+        """Fill the caches of the cached callbacks with the results for the
+        values their inputs can take (the options of dropdowns and radio items,
+        the steps of sliders and the current value of anything else) so the
+        first users do not wait for the renders.
+        :param names: the callback functions to warm (default is all of them)
+        :param budget: the maximum number of calls for each callback, starting
+        with the values in the layout
+        :param workers: number of threads making the calls
+        :param wait: return once every call is done (instead of right away)
+        :return: the number of calls for each callback
+        """
+        index = self.component_index()
+        pool = ThreadPoolExecutor(max_workers=workers)
+        scheduled = {}
+        serial_calls = []
+        for name, (inputs, states, cached_func, serial) in self._warmable.items():
+            if names is not None and name not in names:
+                continue
+            try:
+                arg_list = input_combinations(index, inputs + states, budget)
+            except Exception as error:
+                print("Warming {} failed: {!r}".format(name, error), file=sys.stderr)
+                continue
+            scheduled[name] = len(arg_list)
+            if serial:
+                serial_calls += [(name, cached_func, arg_list)]
+            else:
+                for c_args in arg_list:
+                    pool.submit(self._warm_calls, name, cached_func, [c_args])
+        if serial_calls:
+            # figures made with pyplot are rendered one after the other
+            pool.submit(
+                lambda: [self._warm_calls(*c_calls) for c_calls in serial_calls]
+            )
+        pool.shutdown(wait=wait)
+        return scheduled
+
+    def invalidate_cache(self, name=None):
+        """Clear the cached results (for example after the data is refreshed).
+        :param name: the name of the callback function (default is all of them)
+        """
+        if name is None:
+            caches = list(self._callback_caches.values())
+        else:
+            caches = [self._callback_caches[name]]
+        for c_cache in caches:
+            c_cache.invalidate()
+
+    def cache_stats(self):
+        """The hit and miss counters for every cached callback"""
+        return {
+            name: c_cache.stats() for name, c_cache in self._callback_caches.items()
+        }
+
+    def _register_auto(
+        self,
+        func,
+        callback_func,
+        coalesce=False,
+        debounce=None,
+        decimate=None,
+        decimate_method="minmax",
+    ):
+        """Make the callback for callback_func using the names of func"""
+        output, inputs, states = self._guess_io_args(func)
+        if coalesce or debounce:
+            callback_func = coalesce_callback(
+                callback_func, func.__name__, coalesce=coalesce, debounce=debounce
+            )
+        if decimate:
+            from .decimate import decimate_callback, relayout_inputs
+
+            outputs = output if isinstance(output, list) else [output]
+            callback_func = decimate_callback(
+                callback_func,
+                func.__name__,
+                outputs,
+                len(inputs),
+                max_points=_decimate_points(decimate),
+                method=decimate_method,
+            )
+            inputs = inputs + relayout_inputs(outputs)
+        if coalesce or debounce:
+            import dash_core_components as dcc
+
+            # calls are skipped by page, a memory Store belongs to one tab
+            page_store = "{}_page".format(func.__name__)
+            self._background_components += [dcc.Store(id=page_store)]
+            outputs = output if isinstance(output, list) else [output]
+            callback_func = page_callback(callback_func, len(outputs))
+            output = outputs + [Output(page_store, "data")]
+            states = states + [State(page_store, "data")]
+        return self._add_auto_callback(
+            func.__name__, output, inputs, states, callback_func
+        )
+
+    def _add_auto_callback(self, name, output, inputs, states, callback_func):
+        outputs = output if isinstance(output, list) else [output]
+        self._auto_callbacks += [(name, outputs, inputs, states)]
+        self._callback_names[_callback_id(output)] = name
+        return self.callback(output, inputs=inputs, state=states)(
+            self.metrics.timed(callback_func, name)
+        )
+
+    def _compile_clientside(self, func, **server_options):
+        """The javascript version of func or None (the reason is in the report)"""
+        name = func.__name__
+        self._clientside_report["server"].pop(name, None)
+        used_options = sorted(c_opt for c_opt, c_val in server_options.items() if c_val)
+        try:
+            if used_options:
+                raise NotCompilable("uses {}".format(", ".join(used_options)))
+            js_func = compile_clientside(func)
+        except NotCompilable as error:
+            self._clientside_report["server"][name] = str(error)
+            return None
+        self._clientside_report["clientside"] += [name]
+        return js_func
+
+    def _register_clientside(self, func, js_func):
+        output, inputs, states = self._guess_io_args(func)
+        outputs = output if isinstance(output, list) else [output]
+        self._auto_callbacks += [(func.__name__, outputs, inputs, states)]
+        self.clientside_callback(js_func, output, inputs, states)
+        return func
+
+    def clientside_report(self):
+        # type: () -> Dict[str, Any]
+        """Which auto callbacks were compiled to run in the browser and why the
+        others (with clientside enabled) stay on the server
+        :return: dict(clientside=[names], server={name: reason})
+        """
+        return dict(
+            clientside=list(self._clientside_report["clientside"]),
+            server=dict(self._clientside_report["server"]),
+        )
+
+    def _layout_value(self):
+        layout = super(EasyDash, self)._layout_value()
+        if not self._background_components:
+            return layout
+        # add the hidden components of the background and stream callbacks
+        import dash_html_components as html
+
+        if self._wrapped_layout is None or self._wrapped_layout[0] is not layout:
+            self._wrapped_layout = (
+                layout,
+                html.Div([layout] + self._background_components),
+            )
+        return self._wrapped_layout[1]
+
+    def job_queue(self, executor="thread"):
+        # type: (str) -> JobQueue
+        """The queue running the background jobs (thread or process)"""
+        if executor not in self._job_queues:
+            self._job_queues[executor] = JobQueue(executor=executor)
+        return self._job_queues[executor]
+
+    def _register_background(
+        self,
+        func,
+        job_func,
+        executor="thread",
+        placeholder=None,
+        poll_interval=500,
+        decimate=None,
+        decimate_method="minmax",
+    ):
+        """Make a callback which starts job_func as a background job and returns
+        a placeholder right away. A hidden Interval then polls for the result
+        and a Store keeps the id of the job the page is waiting for."""
+        import dash_core_components as dcc
+
+        name = func.__name__
+        output, inputs, states = self._guess_io_args(func)
+        outputs = output if isinstance(output, list) else [output]
+        interval_id = "{}_job_interval".format(name)
+        store_id = "{}_job".format(name)
+        self._background_components += [
+            dcc.Interval(id=interval_id, interval=poll_interval, disabled=True),
+            dcc.Store(id=store_id),
+        ]
+        jobs = self.job_queue(executor)
+        n_inputs = len(inputs)
+        poll_prop = "{}.n_intervals".format(interval_id)
+
+        def to_outputs(result):
+            return list(result) if isinstance(output, list) else [result]
+
+        def waiting_outputs(job):
+            if callable(placeholder):
+                return to_outputs(placeholder(job.progress, job.message))
+            if placeholder is not None:
+                return to_outputs(placeholder)
+            return [
+                _progress_component(job.progress, job.message)
+                if c_out.component_property == "children"
+                else no_update
+                for c_out in outputs
+            ]
+
+        @wraps(func)
+        def background_func(*args):
+            job_args = args[:n_inputs] + args[n_inputs + 1 : -1]
+            job_id = args[-1]
+            triggered = [c_trig["prop_id"] for c_trig in callback_context.triggered]
+            if job_id is None or triggered != [poll_prop]:
+                # new inputs, the job for the old ones is cancelled if unused
+                if job_id is not None:
+                    jobs.release(job_id)
+                job_id = jobs.submit((name, job_args), job_func, job_args)
+            job = jobs.wait(job_id, timeout=0.05)  # quick jobs skip the placeholder
+            if job is None:  # failed (and reported) or expired
+                return [no_update] * len(outputs) + [True, None]
+            if job.status in ("pending", "running"):
+                return waiting_outputs(job) + [False, job_id]
+            jobs.release(job_id)
+            result = job.future.result()
+            if decimate:
+                result = _decimate_result(result, decimate, decimate_method)
+            return to_outputs(result) + [True, None]
+
+        return self._add_auto_callback(
+            name,
+            outputs + [Output(interval_id, "disabled"), Output(store_id, "data")],
+            inputs + [Input(interval_id, "n_intervals")],
+            states + [State(store_id, "data")],
+            background_func,
+        )
+
+    def _guess_io_args(self, func):
+        """guess_io_args with the ids of the layout (once there is one)"""
+        layout_ids = None if self.layout is None else self.component_index()
+        return guess_io_args(func, layout_ids=layout_ids)
+
+    def component_index(self):
+        # type: () -> LayoutIndex
+        """The id to component index of the layout (rebuilt when it changes)"""
+        layout = self._layout_value()
+        if self._layout_index is None or self._layout_index[0] is not layout:
+            self._layout_index = (layout, LayoutIndex(layout))
+        return self._layout_index[1]
+
+    def validate_callbacks(self, raise_error=True):
+        """Check the ids and properties of every automatic callback against
+        the layout and look for outputs used by more than one callback.
+        :param raise_error: raise a ValueError when there are problems
+        (unknown ids are only reported with suppress_callback_exceptions)
+        :return: lists of problems by kind
+        """
+        report = validate_callbacks(self.component_index(), self._auto_callbacks)
+        kinds = ["duplicate_ids", "duplicate_outputs", "unknown_props"]
+        if not self.config.suppress_callback_exceptions:
+            kinds += ["unknown_ids"]
+        problems = [
+            "{}: {}".format(kind, problem) for kind in kinds for problem in report[kind]
+        ]
+        if problems and raise_error:
+            raise ValueError(
+                "Invalid automatic callbacks:\n{}".format("\n".join(problems))
+            )
+        return report
+
+    def run_server(self, *args, **kwargs):
+        self.validate_callbacks()
+        return super(EasyDash, self).run_server(*args, **kwargs)
+
+    def on_worker_start(self, func):
+        """Register a function to call in every worker started by serve
+        (before it accepts requests), for example to open connections or
+        load data which cannot be shared between processes"""
+        self._worker_hooks += [func]
+        return func
+
+    def warm_up(self):
+        """Request the index, layout and dependencies once so the first real
+        request does not pay for the server setup"""
+        client = self.server.test_client()
+        prefix = self.config.routes_pathname_prefix
+        for c_route in ["", "_dash-layout", "_dash-dependencies"]:
+            client.get(prefix + c_route)
+
+    def serve(
+        self,
+        host="0.0.0.0",
+        port=8050,
+        workers=None,
+        threads=4,
+        max_requests=0,
+        graceful_timeout=30,
+        warm=False,
+    ):
+        """Serve the app with several worker processes each running a pool of
+        threads (instead of the single process development server).
+        :param workers: number of processes (default is one per core)
+        :param threads: number of request threads in each process
+        :param max_requests: restart a worker after this many requests (0 never)
+        :param graceful_timeout: seconds the workers get to finish their
+        requests when stopping or restarting (send SIGHUP to restart them)
+        :param warm: fill the caches of the cached callbacks (see warm) before
+        forking, True or the maximum number of calls for each callback
+
+        The callbacks are checked and the app is warmed up before forking so
+        the workers share the setup, the functions registered with
+        on_worker_start then run in every worker. With several workers the
+        images served by URL are kept in a temporary SqliteCache (unless an
+        image_cache was given) so every worker can serve them.
+        """
+        self.validate_callbacks()
+        shared_dir = None
+        if (workers or os.cpu_count() or 1) > 1 and isinstance(
+            self.image_store.cache, ResultCache
+        ):
+            shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+            shared_dir = tempfile.mkdtemp(prefix="easydash-", dir=shm_dir)
+            self.image_store.cache = SqliteCache(
+                os.path.join(shared_dir, "cache.sqlite"), namespace="images"
+            )
+        try:
+            self.warm_up()
+            if warm:
+                self.warm(budget=100 if warm is True else warm, wait=True)
+            return PreforkServer(
+                self.server,
+                host=host,
+                port=port,
+                workers=workers,
+                threads=threads,
+                max_requests=max_requests,
+                graceful_timeout=graceful_timeout,
+                on_worker_start=self._worker_hooks,
+            ).run()
+        finally:
+            if shared_dir is not None:
+                shutil.rmtree(shared_dir, ignore_errors=True)
+
+    def auto_callback(
+        self,
+        debug=False,
+        cache=None,
+        background=False,
+        placeholder=None,
+        poll_interval=500,
+        coalesce=False,
+        debounce=None,
+        clientside=None,
+        decimate=None,
+        decimate_method="minmax",
+    ):
         """Creates callbacks using function name.
         :param debug: show more detailed messages
+        :param cache: cache results by input values, True for the default
+        LRU cache, an int for its size, a ResultCache(max_size, ttl) or a
+        SqliteCache(path) which every worker process shares
+        :param background: run the function as a background job (True or
+        "thread" for a thread pool, "process" for a process pool) so the
+        request returns right away and the page polls for the result
+        :param placeholder: shown while the job runs (a value, a function of
+        progress and message, default is a progress bar for children)
+        :param poll_interval: milliseconds between polls for the result
+        :param coalesce: identical concurrent calls share one execution and
+        calls from a page which a newer call (to the same callback) replaced
+        before they started are skipped
+        :param debounce: seconds to wait for a newer call from the same page
+        before running (the older call is then skipped), for example to render
+        once per word instead of once per keystroke
+        :param clientside: compile the function to a javascript clientside
+        callback when it only returns an expression of its arguments (using
+        string formatting, +, -, *, /, comparisons, str, int, float, len, ...)
+        so it runs in the browser, it stays on the server otherwise (None uses
+        the auto_clientside setting of the app, see clientside_report)
+        :param decimate: downsample line and scatter traces of the returned
+        figures to about two points per pixel column of the plot (True) or of
+        the given number of columns. The figure outputs are decimated
+        again at full resolution for the visible range when the user zooms in
+        :param decimate_method: "minmax" keeps the minimum and maximum of each
+        pixel column (every peak), "lttb" keeps the visual shape of the line
 
         The function name needs to start with update_ or callback_
         followed immediately by the name of the output it should change
@@ -119,46 +758,345 @@ class EasyDash(Dash):
         def update_output_1(input_1):
             return input_1
 
+        Several outputs are joined with _and_ and filled by one call which
+        returns a value for each of them (in the same order), once the layout
+        is set the name is only split when every part is an id of the layout
+        @ezdash_app.auto_callback()
+        def update_output_1_and_src_of_image_1(input_1):
+            rows = expensive_query(input_1)
+            return len(rows), make_thumbnail(rows)
+
+        async def functions run on an event loop shared by all requests, so
+        slow queries (with aiohttp, asyncpg, ...) wait without holding the loop
+        @ezdash_app.auto_callback()
+        async def update_output_1(input_1):
+            return await fetch_value(input_1)
+
         """
 
         def wrap_callback(callback_func):
-            output, inputs, states = guess_io_args(callback_func)
             if debug:
+                output, inputs, states = self._guess_io_args(callback_func)
                 print("Output:", output)
                 print("Inputs:", inputs)
                 print("States:", states)
 
-            return self.callback(output, inputs=inputs, state=states)(callback_func)
+            use_clientside = self.auto_clientside if clientside is None else clientside
+            if use_clientside:
+                js_func = self._compile_clientside(
+                    callback_func,
+                    cache=cache,
+                    background=background,
+                    coalesce=coalesce,
+                    debounce=debounce,
+                    decimate=decimate,
+                )
+                if js_func is not None:
+                    if debug:
+                        print("Clientside:", js_func)
+                    return self._register_clientside(callback_func, js_func)
+
+            if background == "process":
+                from .render import _call_render_func, register_render_func
+
+                job_func = partial(
+                    _call_render_func, register_render_func(callback_func)
+                )
+                return self._register_background(
+                    callback_func,
+                    job_func,
+                    "process",
+                    placeholder,
+                    poll_interval,
+                    decimate=decimate,
+                    decimate_method=decimate_method,
+                )
+            job_func = self._add_cache(
+                as_sync(callback_func), cache, io_func=callback_func
+            )
+            if background:
+                return self._register_background(
+                    callback_func,
+                    job_func,
+                    "thread",
+                    placeholder,
+                    poll_interval,
+                    decimate=decimate,
+                    decimate_method=decimate_method,
+                )
+            return self._register_auto(
+                callback_func,
+                job_func,
+                coalesce=coalesce,
+                debounce=debounce,
+                decimate=decimate,
+                decimate_method=decimate_method,
+            )
+
+        if background not in (False, True, "thread", "process"):
+            raise ValueError(
+                "background must be True, 'thread' or 'process': {}".format(background)
+            )
+        if background == "process" and cache:
+            raise ValueError(
+                "Process background jobs are already deduplicated, use cache=None"
+            )
+        if decimate_method not in ("minmax", "lttb"):
+            raise ValueError(
+                "decimate_method must be 'minmax' or 'lttb': {}".format(decimate_method)
+            )
+        return wrap_callback
+
+    def stream_callback(self, max_points=1000):
+        """Creates append-only callbacks for live time series. The function
+        is named like an auto_callback with the extendData of a graph as the
+        output and returns the RingBuffer the points are added to (by a
+        thread, another callback, ...). Each page is only sent the points it
+        has not received yet (a hidden Store keeps its position in the buffer)
+        and the graph keeps the last max_points.
+        :param max_points: the points the graph keeps for each trace
+
+        @ezdash_app.stream_callback(max_points=5000)
+        def update_extendData_of_graph(n_intervals_of_interval):
+            return sensor_buffer
+        """
+
+        import dash_core_components as dcc
+
+        from .stream import stream_updates
+
+        def wrap_callback(callback_func):
+            name = callback_func.__name__
+            output, inputs, states = self._guess_io_args(callback_func)
+            if isinstance(output, list) or output.component_property != "extendData":
+                raise ValueError(
+                    "stream_callback needs a single extendData output: {}".format(
+                        output
+                    )
+                )
+            # a memory Store belongs to one page (and starts over on reload)
+            store_id = "{}_cursor".format(name)
+            self._background_components += [dcc.Store(id=store_id)]
+            stream_func = stream_updates(
+                as_sync(callback_func), name, max_points=max_points
+            )
+            return self._add_auto_callback(
+                name,
+                [output, Output(store_id, "data")],
+                inputs,
+                states + [State(store_id, "data")],
+                stream_func,
+            )
 
         return wrap_callback
 
-    def mpl_callback(self, auto=True, use_plotly=False, dpi=None, **sv_args):
+    def mpl_callback(
+        self,
+        auto=True,
+        use_plotly=False,
+        dpi=None,
+        cache=None,
+        threadsafe=False,
+        executor=None,
+        workers=None,
+        timeout=None,
+        image_src="data",
+        encoder=None,
+        background=False,
+        placeholder=None,
+        poll_interval=500,
+        coalesce=False,
+        debounce=None,
+        decimate=None,
+        decimate_method="minmax",
+        **sv_args
+    ):
         """Turns a matplotlib figure into a Dash object.
         :param auto: automatically make callback
-        :param use_plotly: convert mpl to plotly
+        :param use_plotly: convert mpl to plotly (lines, scatter plots, images
+        and bars are converted directly, anything else with plotly.tools)
         :param dpi:
+        :param cache: cache the rendered output (see auto_callback)
+        :param threadsafe: render without pyplot so callbacks can run in
+        several threads, the function should create its figures with
+        easy_dash.viz.new_figure and they are cleared after each request
+        :param executor: "process" to build and encode the figure in a pool of
+        worker processes (the function must be defined at module level)
+        :param workers: the number of worker processes
+        :param timeout: the maximum seconds to wait for a process render
+        :param image_src: "data" to inline the image as a base64 data URI or
+        "url" to serve it (cacheable by the browser) from the image route
+        :param encoder: an ImageEncoder (or format name like "webp") to encode
+        the rasterized figure with instead of savefig
+        :param background: build and render the figure as a background job (in
+        a thread, combine with threadsafe=True and/or executor="process") and
+        poll for the result, see auto_callback for placeholder and poll_interval
+        :param coalesce: share and skip calls (see auto_callback)
+        :param debounce: seconds to wait for newer calls (see auto_callback)
+        :param decimate: downsample large lines and scatter plots of the plotly
+        figure (with use_plotly, see auto_callback for decimate_method)
         :param sv_args:
         :return:
+
+        A threadsafe example is
+        @ezdash_app.mpl_callback(threadsafe=True)
+        def update_plot(value_of_plot_size):
+            fig = new_figure(figsize=(float(value_of_plot_size), 5))
+            fig.add_subplot(111).plot([0, 1], [1, 0])
+            return fig
         """
 
-        def wrap_func(func):
-            @wraps(func)
-            def add_context(*args, **kwargs):
-                self.auto_callback(func)
-                out_fig = func(*args, **kwargs)
-                if use_plotly:
-                    return dcc.Graph(figure=tls.mpl_to_plotly(out_fig))
+        import dash_core_components as dcc
+        import dash_html_components as html
+
+        from .mpl_plotly import mpl_to_plotly
+        from .viz import (
+            as_encoder,
+            bytes_to_uri,
+            close_figures,
+            fig_to_bytes,
+            fig_to_image,
+        )
+
+        encoder = as_encoder(encoder)
+        mimetype = "image/png" if encoder is None else encoder.mimetype
+
+        def to_img(name, img_bytes):
+            with self.metrics.phase(name, "encode"):
+                if encoder is not None and not isinstance(img_bytes, bytes):
+                    img_bytes = encoder.encode(img_bytes)
+                if image_src == "url":
+                    return html.Img(src=self.image_url(img_bytes, mimetype))
+                return html.Img(src=bytes_to_uri(img_bytes, mimetype))
+
+        def to_component(name, out_fig):
+            if use_plotly:
+                with self.metrics.phase(name, "convert"):
+                    plotly_fig = mpl_to_plotly(out_fig)
+                if not threadsafe:
+                    close_figures(out_fig)
+                return dcc.Graph(figure=plotly_fig)
+            with self.metrics.phase(name, "rasterize"):
+                if encoder is None:
+                    # savefig rasterizes and writes the png in one step
+                    img_data = fig_to_bytes(out_fig, dpi=dpi, **sv_args)
                 else:
-                    return html.Img(src=fig_to_uri(out_fig, dpi=dpi, **sv_args))
+                    img_data = fig_to_image(out_fig, dpi=dpi)
+            if not threadsafe:
+                close_figures(out_fig)
+            return to_img(name, img_data)
 
+        def wrap_func(func):
+            if executor == "process":
+                if auto and isinstance(self._guess_io_args(func)[0], list):
+                    raise ValueError("The process executor supports a single output")
+                add_context = self._process_render_func(
+                    func,
+                    to_img,
+                    workers=workers,
+                    timeout=timeout,
+                    dpi=dpi,
+                    encoder=encoder,
+                    **sv_args
+                )
+            else:
+                add_context = self._local_render_func(func, to_component, threadsafe)
+
+            add_context = self._add_cache(
+                add_context,
+                cache,
+                name=func.__name__,
+                io_func=func,
+                serial=executor != "process" and not threadsafe,
+            )
+            if image_src == "url" and hasattr(add_context, "cache"):
+                add_context = self._keep_images(add_context, func.__name__)
+            if auto and background:
+                return self._register_background(
+                    func,
+                    add_context,
+                    "thread",
+                    placeholder,
+                    poll_interval,
+                    decimate=decimate,
+                    decimate_method=decimate_method,
+                )
             if auto:
-                output, inputs, states = guess_io_args(func)
-                return self.callback(output, inputs=inputs, state=states)(add_context)
+                return self._register_auto(
+                    func,
+                    add_context,
+                    coalesce=coalesce,
+                    debounce=debounce,
+                    decimate=decimate,
+                    decimate_method=decimate_method,
+                )
             else:
                 return add_context
 
+        if executor not in (None, "process"):
+            raise ValueError("executor must be None or 'process': {}".format(executor))
+        if executor == "process" and use_plotly:
+            raise ValueError("The process executor only supports images")
+        if decimate and not use_plotly:
+            raise ValueError("decimate needs use_plotly=True")
+        if decimate_method not in ("minmax", "lttb"):
+            raise ValueError(
+                "decimate_method must be 'minmax' or 'lttb': {}".format(decimate_method)
+            )
+        if image_src not in ("data", "url"):
+            raise ValueError("image_src must be 'data' or 'url': {}".format(image_src))
         return wrap_func
 
+    def _local_render_func(self, func, to_component, threadsafe):
+        from matplotlib.figure import Figure
+
+        from .viz import FigureFactory
+
+        name = func.__name__
+        func = as_sync(func)
+
+        def build_and_render(*args, **kwargs):
+            with self.metrics.phase(name, "build"):
+                out_fig = func(*args, **kwargs)
+            if isinstance(out_fig, (list, tuple)):
+                # several outputs, only the figures are converted
+                return [
+                    to_component(name, c_out) if isinstance(c_out, Figure) else c_out
+                    for c_out in out_fig
+                ]
+            return to_component(name, out_fig)
+
+        @wraps(func)
+        def add_context(*args, **kwargs):
+            if threadsafe:
+                # each request gets its own factory for new_figure
+                with FigureFactory():
+                    return build_and_render(*args, **kwargs)
+            return build_and_render(*args, **kwargs)
+
+        return add_context
+
+    def _process_render_func(
+        self, func, to_img, workers=None, timeout=None, **render_args
+    ):
+        from .render import ProcessRenderer, register_render_func
+
+        func_key = register_render_func(func)
+        if workers not in self._renderers:
+            self._renderers[workers] = ProcessRenderer(workers=workers)
+        renderer = self._renderers[workers]
+
+        @wraps(func)
+        def add_context(*args):
+            # building and rasterizing both happen in the worker
+            with self.metrics.phase(func.__name__, "render"):
+                img_bytes = renderer.render(
+                    func_key, args, timeout=timeout, **render_args
+                )
+            return to_img(func.__name__, img_bytes)
+
+        return add_context
+
     def _repr_html_(self):
         return self.show_app()
 
@@ -0,0 +1,144 @@
+"""Coalesce identical requests and skip the ones newer requests replaced"""
+from __future__ import print_function
+
+import threading
+import time
+import uuid
+from functools import partial, wraps
+
+import flask
+from dash import no_update
+from dash.exceptions import PreventUpdate
+
+from .cache import ResultCache, make_cache_key
+
+
+def page_id():
+    # type: () -> str
+    """The id of the page making the current request (see page_callback), a
+    new id is made for the first request of a page"""
+    c_id = getattr(flask.g, "easydash_page", None)
+    if c_id is None:
+        c_id = flask.g.easydash_page = uuid.uuid4().hex
+    return c_id
+
+
+def page_callback(func, n_outputs):
+    """Wrap a callback so it takes the id of the page (kept in a memory
+    dcc.Store, which every tab has its own of) as its last argument and
+    returns the id as an extra output when the page did not have one yet
+    (must run inside a request).
+    :param n_outputs: the number of outputs of func
+    """
+
+    @wraps(func)
+    def paged_func(*args):
+        flask.g.easydash_page = args[-1]
+        result = func(*args[:-1])
+        result = list(result) if n_outputs > 1 else [result]
+        return result + [no_update if args[-1] is not None else page_id()]
+
+    return paged_func
+
+
+class _Call(object):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None  # type: Optional[BaseException]
+
+
+class SingleFlight(object):
+    """Concurrent calls with the same key share one execution
+    >>> flight = SingleFlight()
+    >>> flight.do("key", lambda x: x + 1, 1)
+    2
+    """
+
+    def __init__(self):
+        self._calls = {}  # type: Dict[str, _Call]
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        with self._lock:
+            c_call = self._calls.get(key)
+            leader = c_call is None
+            if leader:
+                c_call = self._calls[key] = _Call()
+        if not leader:
+            c_call.done.wait()
+        else:
+            try:
+                c_call.result = func(*args)
+            except BaseException as error:
+                c_call.error = error
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                c_call.done.set()
+        if c_call.error is not None:
+            raise c_call.error
+        return c_call.result
+
+
+class _PageState(object):
+    __slots__ = ("latest", "lock")
+
+    def __init__(self):
+        self.latest = 0
+        self.lock = threading.Lock()
+
+
+class Supersession(object):
+    """Runs the calls of each page (and callback) one at a time and skips
+    calls which a newer call replaced before they started"""
+
+    def __init__(self, pages=None):
+        self.pages = ResultCache(max_size=10000, ttl=3600) if pages is None else pages
+        self._lock = threading.Lock()
+
+    def _state(self, key):
+        with self._lock:
+            c_state = self.pages.get(key, count=False)
+            if c_state is None:
+                c_state = _PageState()
+                self.pages.set(key, c_state)
+            c_state.latest += 1
+            return c_state, c_state.latest
+
+    def run(self, key, func, args, debounce=None):
+        """Call func unless a newer call with the same key arrives during the
+        debounce window or while an older call is still running
+        :raises PreventUpdate: when the call was replaced
+        """
+        c_state, seq = self._state(key)
+        if debounce:
+            time.sleep(debounce)
+        if seq != c_state.latest:
+            raise PreventUpdate
+        with c_state.lock:
+            if seq != c_state.latest:
+                raise PreventUpdate
+            return func(*args)
+
+
+def coalesce_callback(func, name, coalesce=True, debounce=None):
+    """Wrap a callback with single-flight coalescing of identical calls and
+    per-page skipping of replaced calls (must run inside a page_callback).
+    :param coalesce: share one execution between identical concurrent calls
+    and skip calls of a page replaced before they started
+    :param debounce: seconds to wait for a newer call before starting
+    """
+    flight = SingleFlight()
+    supersession = Supersession()
+
+    @wraps(func)
+    def coalesced_func(*args):
+        run_func = func
+        if coalesce:
+            run_func = partial(flight.do, make_cache_key(name, args), func)
+        return supersession.run((page_id(), name), run_func, args, debounce)
+
+    return coalesced_func
@@ -0,0 +1,63 @@
+"""Serve encoded images from a URL instead of inlining them as data URIs"""
+from __future__ import print_function
+
+import hashlib
+
+import flask
+
+from .cache import ResultCache
+
+IMAGE_ROUTE = "_easydash/img/"
+TILE_ROUTE = "_easydash/tiles/"
+
+
+class ImageStore(object):
+    """Content addressed store for encoded images.
+    >>> store = ImageStore()
+    >>> key = store.add(b"abc", "image/gif")
+    >>> key
+    'a9993e364706816aba3e25717850c26c9cd0d89d'
+    >>> store.get(key)
+    ('image/gif', b'abc')
+    >>> store.get("missing") is None
+    True
+    >>> store.touch(key), store.touch("missing")
+    (True, False)
+    """
+
+    def __init__(self, cache=None):
+        """
+        :param cache: where the images are kept (default is an LRU cache of
+        512 images), anything with the ResultCache get/set methods works
+        """
+        self.cache = ResultCache(max_size=512) if cache is None else cache
+
+    def add(self, img_bytes, mimetype="image/png"):
+        # type: (bytes, str) -> str
+        """Store an image and return its content hash"""
+        key = hashlib.sha1(img_bytes).hexdigest()
+        if self.cache.get(key, count=False) is None:
+            self.cache.set(key, (mimetype, img_bytes))
+        return key
+
+    def touch(self, key):
+        # type: (str) -> bool
+        """Mark an image as recently used, False when it is not there"""
+        return self.cache.get(key, count=False) is not None
+
+    def get(self, key):
+        # type: (str) -> Optional[Tuple[str, bytes]]
+        """The mimetype and bytes of an image (or None when it is not there)"""
+        return self.cache.get(key)
+
+    def serve(self, img_key):
+        """A flask view for the images with ETag and Cache-Control headers"""
+        entry = self.get(img_key)
+        if entry is None:
+            flask.abort(404)
+        mimetype, img_bytes = entry
+        response = flask.Response(img_bytes, mimetype=mimetype)
+        response.set_etag(img_key)
+        # the content never changes for a given key
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response.make_conditional(flask.request)
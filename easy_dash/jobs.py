@@ -0,0 +1,172 @@
+"""A local job queue for callbacks which take too long for one request"""
+from __future__ import print_function
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .cache import ResultCache, make_cache_key
+
+_JOB_STATE = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised by report_progress when nobody is waiting for the job anymore"""
+
+
+def report_progress(progress=None, message=None):
+    """Report the progress of the background job running in this thread.
+    :param progress: the fraction done (0-1) or None if unknown
+    :param message: a short text to show while waiting
+    :raises JobCancelled: when newer inputs replaced the job, so a long job
+    can stop early by calling this every now and then
+    Outside of a (thread backed) job this does nothing
+    >>> report_progress(0.5, "half way")
+    """
+    job = getattr(_JOB_STATE, "job", None)
+    if job is None:
+        return
+    job.progress = progress
+    job.message = message
+    if job.cancelled.is_set():
+        raise JobCancelled(job.job_id)
+
+
+class Job(object):
+    __slots__ = ("job_id", "future", "refs", "progress", "message", "cancelled")
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.future = None
+        self.refs = 1
+        self.progress = None  # type: Optional[float]
+        self.message = None  # type: Optional[str]
+        self.cancelled = threading.Event()
+
+    @property
+    def status(self):
+        # type: () -> str
+        if self.future.cancelled() or self.cancelled.is_set():
+            return "cancelled"
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        return "error" if self.future.exception() is not None else "done"
+
+
+def _run_job(job, func, args):
+    _JOB_STATE.job = job
+    try:
+        return func(*args)
+    finally:
+        _JOB_STATE.job = None
+
+
+class JobQueue(object):
+    """Runs jobs in a thread or process pool, identical jobs (same key) share
+    one run and a job nobody waits for anymore is cancelled. A job is dropped
+    once everyone waiting for it released it, results are not cached here.
+    >>> import time
+    >>> queue = JobQueue(workers=2)
+    >>> def slow_double(x):
+    ...     time.sleep(0.05)
+    ...     return 2 * x
+    >>> job_id = queue.submit(("slow_double", 3), slow_double, (3,))
+    >>> queue.submit(("slow_double", 3), slow_double, (3,)) == job_id
+    True
+    >>> queue.wait(job_id).status, queue.get(job_id).future.result()
+    ('done', 6)
+    >>> queue.release(job_id)
+    >>> queue.release(job_id)
+    >>> queue.get(job_id) is None
+    True
+    """
+
+    def __init__(self, executor="thread", workers=None, jobs=None):
+        """
+        :param executor: thread or process (the functions and their results
+        must be picklable for processes and report_progress has no effect)
+        :param workers: the size of the pool
+        :param jobs: the cache holding the jobs until they are released (default
+        keeps at most 256 for an hour, for pages which stopped polling)
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(
+                "executor must be thread or process not {}".format(executor)
+            )
+        self.executor = executor
+        self.workers = workers
+        self.jobs = ResultCache(max_size=256, ttl=3600) if jobs is None else jobs
+        self._pool = None
+        self._pid = None  # type: Optional[int]
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None or self._pid != os.getpid():
+            # the pool of the parent does not survive a fork (serve)
+            self._pid = os.getpid()
+            if self.executor == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @staticmethod
+    def job_id(key):
+        # type: (Any) -> str
+        return hashlib.sha1(make_cache_key(key).encode("utf8")).hexdigest()
+
+    def submit(self, key, func, args):
+        # type: (Any, Callable, Tuple) -> str
+        """Start a job (or join the identical one which is queued, running or
+        finished but not yet released by everyone) and return its id"""
+        job_id = self.job_id(key)
+        with self._lock:
+            job = self.jobs.get(job_id, count=False)
+            if job is not None and job.status not in ("cancelled", "error"):
+                job.refs += 1
+                return job_id
+            job = Job(job_id)
+            if self.executor == "process":
+                job.future = self._get_pool().submit(func, *args)
+            else:
+                job.future = self._get_pool().submit(_run_job, job, func, args)
+            self.jobs.set(job_id, job)
+        return job_id
+
+    def get(self, job_id):
+        # type: (str) -> Optional[Job]
+        return self.jobs.get(job_id, count=False)
+
+    def wait(self, job_id, timeout=None):
+        # type: (str, Optional[float]) -> Optional[Job]
+        """Wait until the job is done (or the timeout runs out)"""
+        job = self.get(job_id)
+        if job is not None:
+            try:
+                job.future.exception(timeout=timeout)
+            except Exception:  # still running or cancelled
+                pass
+        return job
+
+    def release(self, job_id):
+        """Stop waiting for a job, when nobody else waits for it the job is
+        cancelled (if it is still running) and forgotten, so the same inputs
+        later start a new run"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return
+            job.refs -= 1
+            if job.refs > 0:
+                return
+            if not job.future.done():
+                job.cancelled.set()
+                job.future.cancel()
+            self.jobs.invalidate(job_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=wait)
+                self._pool = None
@@ -0,0 +1,214 @@
+"""Index the components of a layout and check callbacks against it"""
+from __future__ import print_function
+
+import decimal
+import itertools
+import json
+import math
+from collections import deque
+
+from dash.development.base_component import Component
+
+
+_MISSING = object()
+
+
+def _id_key(comp_id):
+    # pattern matching ids are dictionaries
+    if isinstance(comp_id, dict):
+        return json.dumps(comp_id, sort_keys=True)
+    return comp_id
+
+
+class LayoutIndex(object):
+    """An id to component index built with one walk of the layout tree
+    >>> import dash_html_components as html
+    >>> index = LayoutIndex(html.Div([html.Div(id="a"), [html.Span(id="b")]]))
+    >>> sorted(index.components)
+    ['a', 'b']
+    >>> "a" in index, index.get("c")
+    (True, None)
+    >>> index.has_prop("b", "children"), index.has_prop("b", "valu")
+    (True, False)
+    >>> LayoutIndex(html.Div([html.Div(id="a"), html.Div(id="a")])).duplicate_ids
+    ['a']
+    """
+
+    def __init__(self, layout):
+        self.components = {}  # type: Dict[str, Component]
+        self.duplicate_ids = []  # type: List[str]
+        queue = deque([layout])
+        while queue:
+            c_comp = queue.popleft()
+            if isinstance(c_comp, (list, tuple)):
+                queue.extend(c_comp)
+                continue
+            if not isinstance(c_comp, Component):
+                continue
+            comp_id = getattr(c_comp, "id", None)
+            if comp_id is not None:
+                comp_key = _id_key(comp_id)
+                if comp_key in self.components:
+                    self.duplicate_ids += [comp_key]
+                self.components[comp_key] = c_comp
+            queue.append(getattr(c_comp, "children", None))
+
+    def __contains__(self, comp_id):
+        return _id_key(comp_id) in self.components
+
+    def get(self, comp_id, default=None):
+        return self.components.get(_id_key(comp_id), default)
+
+    def has_prop(self, comp_id, prop_name):
+        # type: (str, str) -> bool
+        """Checks if the component supports the property"""
+        c_comp = self.get(comp_id)
+        if c_comp is None:
+            return False
+        if prop_name in getattr(c_comp, "_prop_names", [prop_name]):
+            return True
+        wildcards = getattr(c_comp, "_valid_wildcard_attributes", [])
+        return any(prop_name.startswith(c_wild) for c_wild in wildcards)
+
+
+def validate_callbacks(index, callbacks):
+    # type: (LayoutIndex, List[Tuple[str, List, List, List]]) -> Dict[str, List[str]]
+    """Check every Output/Input/State of the callbacks in a single pass.
+    :param index: the LayoutIndex of the layout
+    :param callbacks: the name, outputs, inputs and states of each callback
+    :return: lists of problems by kind (all empty if everything is fine)
+    >>> import dash_html_components as html
+    >>> import dash_core_components as dcc
+    >>> from dash.dependencies import Input, Output
+    >>> index = LayoutIndex(html.Div([dcc.Input(id="inp"), html.Div(id="out")]))
+    >>> report = validate_callbacks(index, [
+    ...     ("update_out", [Output("out", "children")], [Input("inp", "value")], []),
+    ...     ("update_children_of_out", [Output("out", "children")], [Input("imp", "value")], []),
+    ...     ("update_src_of_out", [Output("out", "src")], [], []),
+    ... ])
+    >>> for kind, problems in sorted(report.items()):
+    ...     print(kind, problems)
+    duplicate_ids []
+    duplicate_outputs ['out.children (update_children_of_out and update_out)']
+    unknown_ids ['imp.value (update_children_of_out)']
+    unknown_props ['out.src (update_src_of_out)']
+    """
+    report = dict(
+        duplicate_ids=list(index.duplicate_ids),
+        duplicate_outputs=[],
+        unknown_ids=[],
+        unknown_props=[],
+    )  # type: Dict[str, List[str]]
+    output_owner = {}  # type: Dict[str, str]
+    for name, outputs, inputs, states in callbacks:
+        for c_dep in list(outputs) + list(inputs) + list(states):
+            dep_name = "{}.{}".format(c_dep.component_id, c_dep.component_property)
+            if c_dep.component_id not in index:
+                report["unknown_ids"] += ["{} ({})".format(dep_name, name)]
+            elif not index.has_prop(c_dep.component_id, c_dep.component_property):
+                report["unknown_props"] += ["{} ({})".format(dep_name, name)]
+        for c_out in outputs:
+            out_name = "{}.{}".format(c_out.component_id, c_out.component_property)
+            if out_name in output_owner:
+                owners = sorted([output_owner[out_name], name])
+                report["duplicate_outputs"] += [
+                    "{} ({} and {})".format(out_name, *owners)
+                ]
+            else:
+                output_owner[out_name] = name
+    return report
+
+
+def _as_number(value):
+    # sliders send whole numbers as ints
+    return int(value) if float(value).is_integer() else value
+
+
+def _decimals(value):
+    """
+    >>> _decimals(0.25), _decimals(1e-05), _decimals(2)
+    (2, 5, 0)
+    """
+    return max(0, -decimal.Decimal(str(value)).as_tuple().exponent)
+
+
+def _slider_values(comp, limit):
+    c_min, c_max = getattr(comp, "min", None), getattr(comp, "max", None)
+    step = getattr(comp, "step", _MISSING)
+    if step is None:  # only the marks can be picked
+        marks = getattr(comp, "marks", None) or {}
+        return sorted(_as_number(float(c_mark)) for c_mark in marks)
+    step = 1 if step is _MISSING else step
+    if c_min is None or c_max is None or step <= 0:
+        return None
+    n_values = int(math.floor((c_max - c_min) / float(step) + 1e-9)) + 1
+    if n_values > limit:
+        return None
+    # round like the slider does so the values match the cache keys
+    decimals = max(_decimals(c_min), _decimals(step))
+    return [_as_number(round(c_min + i * step, decimals)) for i in range(n_values)]
+
+
+def _option_values(comp):
+    values = []
+    for c_opt in getattr(comp, "options", None) or []:
+        if not isinstance(c_opt, dict):
+            values += [c_opt]
+        elif not c_opt.get("disabled", False):
+            values += [c_opt.get("value")]
+    return values
+
+
+def input_domain(comp, prop_name, limit=1000):
+    # type: (Optional[Component], str, int) -> List[Any]
+    """The values an input can take: the options of single choice Dropdowns
+    and RadioItems and the steps (or marks) of Sliders, any other input only
+    has its current value (which is always the first value)
+    >>> import dash_core_components as dcc
+    >>> input_domain(dcc.Slider(min=0, max=1, step=0.25, value=0.5), "value")
+    [0.5, 0, 0.25, 0.75, 1]
+    >>> input_domain(dcc.Slider(min=0, max=3e-05, step=1e-05), "value")
+    [None, 0, 1e-05, 2e-05, 3e-05]
+    >>> input_domain(dcc.Dropdown(options=[{"label": "A", "value": "a"}]), "value")
+    [None, 'a']
+    >>> input_domain(dcc.Input(value="text"), "value")
+    ['text']
+    """
+    current = getattr(comp, prop_name, None)
+    values = None
+    if (
+        comp is not None
+        and prop_name == "value"
+        and getattr(comp, "_namespace", None) == "dash_core_components"
+    ):
+        comp_type = getattr(comp, "_type", None)
+        if comp_type == "Slider":
+            values = _slider_values(comp, limit)
+        elif comp_type == "RadioItems" or (
+            comp_type == "Dropdown" and not getattr(comp, "multi", False)
+        ):
+            values = _option_values(comp)
+    return [current] + [c_val for c_val in values or [] if c_val != current]
+
+
+def input_combinations(index, deps, budget=100):
+    # type: (LayoutIndex, List[Any], Optional[int]) -> List[Tuple[Any, ...]]
+    """The combinations of values the inputs (and states) can take, starting
+    with the current values of the layout, at most budget of them
+    >>> import dash_html_components as html
+    >>> import dash_core_components as dcc
+    >>> from dash.dependencies import Input, State
+    >>> index = LayoutIndex(html.Div([
+    ...     dcc.RadioItems(id="color", options=["red", "blue"], value="red"),
+    ...     dcc.Slider(id="size", min=1, max=3, value=2),
+    ...     dcc.Input(id="title", value="plot"),
+    ... ]))
+    >>> input_combinations(index, [Input("color", "value"), Input("size", "value"),
+    ...     State("title", "value")], budget=4)
+    [('red', 2, 'plot'), ('red', 1, 'plot'), ('red', 3, 'plot'), ('blue', 2, 'plot')]
+    """
+    domains = [
+        input_domain(index.get(c_dep.component_id), c_dep.component_property)
+        for c_dep in deps
+    ]
+    return list(itertools.islice(itertools.product(*domains), budget))
@@ -0,0 +1,219 @@
+"""Lightweight per-callback timing and payload metrics"""
+from __future__ import print_function
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+
+METRICS_ROUTE = "_easydash/metrics"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_timer = getattr(time, "perf_counter", time.time)
+
+
+class _CallbackStats(object):
+    __slots__ = ("calls", "errors", "buckets", "latency_sum", "payload_bytes", "phases")
+
+    def __init__(self, n_buckets):
+        self.calls = 0
+        self.errors = 0
+        self.buckets = [0] * (n_buckets + 1)  # the last one is +Inf
+        self.latency_sum = 0.0
+        self.payload_bytes = 0
+        self.phases = {}  # type: Dict[str, List[float]]
+
+
+class CallbackMetrics(object):
+    """Thread-safe counters, latency histograms and phase timings by callback
+    >>> metrics = CallbackMetrics(buckets=(0.1, 1.0))
+    >>> metrics.observe("update_out", 0.05)
+    >>> metrics.observe("update_out", 0.5, error=True)
+    >>> metrics.observe_payload("update_out", 120)
+    >>> metrics.observe_phase("update_out", "build", 0.25)
+    >>> snap = metrics.snapshot()["update_out"]
+    >>> snap["calls"], snap["errors"], snap["payload_bytes"], snap["latency_buckets"]
+    (2, 1, 120, [(0.1, 1), (1.0, 2), ('+Inf', 2)])
+    >>> snap["phases"]
+    {'build': {'seconds': 0.25, 'count': 1}}
+    >>> print(metrics.to_prometheus().splitlines()[2])
+    easydash_callback_calls_total{callback="update_out"} 2
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stats = {}  # type: Dict[str, _CallbackStats]
+        self._lock = threading.Lock()
+
+    def _get(self, name):
+        # type: (str) -> _CallbackStats
+        c_stats = self._stats.get(name)
+        if c_stats is None:
+            c_stats = self._stats[name] = _CallbackStats(len(self.buckets))
+        return c_stats
+
+    def observe(self, name, seconds, error=False):
+        """Record one call of a callback"""
+        bucket_idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            c_stats = self._get(name)
+            c_stats.calls += 1
+            c_stats.errors += int(error)
+            c_stats.buckets[bucket_idx] += 1
+            c_stats.latency_sum += seconds
+
+    def observe_payload(self, name, n_bytes):
+        """Record the size of a callback response"""
+        with self._lock:
+            self._get(name).payload_bytes += n_bytes
+
+    def observe_phase(self, name, phase, seconds):
+        """Record the time spent in one phase of a callback (build, rasterize, ...)"""
+        with self._lock:
+            c_phase = self._get(name).phases.setdefault(phase, [0.0, 0])
+            c_phase[0] += seconds
+            c_phase[1] += 1
+
+    @contextmanager
+    def phase(self, name, phase):
+        """Time the enclosed block as a phase of the callback"""
+        start_time = _timer()
+        try:
+            yield
+        finally:
+            self.observe_phase(name, phase, _timer() - start_time)
+
+    def timed(self, func, name=None):
+        """Wrap a callback so every call is recorded (PreventUpdate is not an error)"""
+        name = name or func.__name__
+
+        @wraps(func)
+        def timed_func(*args, **kwargs):
+            start_time = _timer()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except PreventUpdate:
+                raise
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.observe(name, _timer() - start_time, error=error)
+
+        return timed_func
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        # type: () -> Dict[str, Dict[str, Any]]
+        """A copy of all of the metrics by callback name"""
+        with self._lock:
+            out_dict = {}
+            for name, c_stats in self._stats.items():
+                cumulative = 0
+                latency_buckets = []
+                for c_bound, c_count in zip(
+                    list(self.buckets) + ["+Inf"], c_stats.buckets
+                ):
+                    cumulative += c_count
+                    latency_buckets += [(c_bound, cumulative)]
+                out_dict[name] = dict(
+                    calls=c_stats.calls,
+                    errors=c_stats.errors,
+                    latency_sum=c_stats.latency_sum,
+                    latency_buckets=latency_buckets,
+                    payload_bytes=c_stats.payload_bytes,
+                    phases={
+                        c_phase: dict(seconds=c_sum, count=c_count)
+                        for c_phase, (c_sum, c_count) in c_stats.phases.items()
+                    },
+                )
+            return out_dict
+
+    def to_prometheus(self):
+        # type: () -> str
+        """The metrics in the Prometheus text exposition format"""
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def add_metric(metric, metric_type, help_text, rows):
+            lines.extend(
+                [
+                    "# HELP {} {}".format(metric, help_text),
+                    "# TYPE {} {}".format(metric, metric_type),
+                ]
+            )
+            for labels, value in rows:
+                label_str = ",".join('{}="{}"'.format(*c_label) for c_label in labels)
+                lines.append("{}{{{}}} {}".format(metric, label_str, value))
+
+        add_metric(
+            "easydash_callback_calls_total",
+            "counter",
+            "Number of callback calls",
+            [([("callback", name)], snap["calls"]) for name, snap in snapshot],
+        )
+        add_metric(
+            "easydash_callback_errors_total",
+            "counter",
+            "Number of callback calls which raised an exception",
+            [([("callback", name)], snap["errors"]) for name, snap in snapshot],
+        )
+        add_metric(
+            "easydash_callback_payload_bytes_total",
+            "counter",
+            "Bytes of callback responses (before compression)",
+            [([("callback", name)], snap["payload_bytes"]) for name, snap in snapshot],
+        )
+        lines.extend(
+            [
+                "# HELP easydash_callback_latency_seconds Callback latency",
+                "# TYPE easydash_callback_latency_seconds histogram",
+            ]
+        )
+        for name, snap in snapshot:
+            for c_bound, c_count in snap["latency_buckets"]:
+                lines.append(
+                    'easydash_callback_latency_seconds_bucket{{callback="{}",le="{}"}} {}'.format(
+                        name, c_bound, c_count
+                    )
+                )
+            lines.append(
+                'easydash_callback_latency_seconds_sum{{callback="{}"}} {}'.format(
+                    name, snap["latency_sum"]
+                )
+            )
+            lines.append(
+                'easydash_callback_latency_seconds_count{{callback="{}"}} {}'.format(
+                    name, snap["calls"]
+                )
+            )
+        phase_rows = [
+            (name, c_phase, c_vals)
+            for name, snap in snapshot
+            for c_phase, c_vals in sorted(snap["phases"].items())
+        ]
+        lines.extend(
+            [
+                "# HELP easydash_callback_phase_seconds Time spent in each phase",
+                "# TYPE easydash_callback_phase_seconds summary",
+            ]
+        )
+        for name, c_phase, c_vals in phase_rows:
+            labels = 'callback="{}",phase="{}"'.format(name, c_phase)
+            lines.append(
+                "easydash_callback_phase_seconds_sum{{{}}} {}".format(
+                    labels, c_vals["seconds"]
+                )
+            )
+            lines.append(
+                "easydash_callback_phase_seconds_count{{{}}} {}".format(
+                    labels, c_vals["count"]
+                )
+            )
+        return "\n".join(lines) + "\n"
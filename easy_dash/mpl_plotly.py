@@ -0,0 +1,308 @@
+"""Convert simple matplotlib figures to plotly figures without walking every
+artist through plotly.tools.mpl_to_plotly"""
+from __future__ import print_function
+
+import numpy as np
+from matplotlib.collections import PathCollection
+from matplotlib.colors import to_hex, to_rgba
+from matplotlib.container import BarContainer
+from matplotlib.image import AxesImage
+from matplotlib.patches import Rectangle
+
+_DASHES = {"--": "dash", ":": "dot", "-.": "dashdot", "dashed": "dash"}
+_LINE_SHAPES = {
+    "default": "linear",
+    "steps": "vh",
+    "steps-pre": "vh",
+    "steps-post": "hv",
+    "steps-mid": "hvh",
+}
+_COLORSCALE_STEPS = 11
+
+
+class UnsupportedArtist(ValueError):
+    """The figure contains something the fast converter does not handle"""
+
+
+def _color(mpl_color, alpha=None):
+    # type: (...) -> str
+    """A plotly color string
+    >>> _color("r"), _color((0, 0, 1, 0.5))
+    ('#ff0000', 'rgba(0,0,255,0.5)')
+    """
+    r, g, b, a = to_rgba(mpl_color, alpha)
+    if a >= 1:
+        return to_hex((r, g, b))
+    return "rgba({:.0f},{:.0f},{:.0f},{:.3g})".format(255 * r, 255 * g, 255 * b, a)
+
+
+def _colorscale(cmap):
+    # type: (...) -> List[List]
+    """Sample a matplotlib colormap as a plotly colorscale
+    >>> from matplotlib import cm
+    >>> _colorscale(cm.get_cmap("gray"))[::10]
+    [[0.0, '#000000'], [1.0, '#ffffff']]
+    """
+    steps = np.linspace(0, 1, _COLORSCALE_STEPS)
+    return [[float(c_step), _color(cmap(c_step))] for c_step in steps]
+
+
+def _label(artist):
+    label = artist.get_label()
+    if not label or label.startswith("_"):
+        return None
+    return label
+
+
+def _line_trace(line, ax):
+    if line.get_transform() != ax.transData:
+        # axhline, axvline, ... are partly in axes coordinates
+        raise UnsupportedArtist("line is not in data coordinates")
+    xy_data = line.get_xydata()
+    has_line = line.get_linestyle() not in ("None", " ", "", "none")
+    has_marker = line.get_marker() not in ("None", " ", "", "none", None)
+    modes = [("lines", has_line), ("markers", has_marker)]
+    mode = "+".join(c_mode for c_mode, c_on in modes if c_on)
+    trace = dict(
+        type="scatter",
+        mode=mode or "none",
+        x=xy_data[:, 0],
+        y=xy_data[:, 1],
+        line=dict(
+            color=_color(line.get_color(), line.get_alpha()),
+            width=line.get_linewidth(),
+            dash=_DASHES.get(line.get_linestyle(), "solid"),
+            shape=_LINE_SHAPES[line.get_drawstyle()],
+        ),
+    )
+    if has_marker:
+        trace["marker"] = dict(
+            color=_color(line.get_markerfacecolor(), line.get_alpha()),
+            size=line.get_markersize(),
+        )
+    return trace
+
+
+def _scatter_trace(coll, ax):
+    if coll.get_offset_transform() != ax.transData:
+        raise UnsupportedArtist("scatter offsets are not in data coordinates")
+    offsets = np.asarray(coll.get_offsets())
+    marker = dict(size=np.sqrt(coll.get_sizes()))
+    if marker["size"].size == 1:
+        marker["size"] = float(marker["size"][0])
+    values = coll.get_array()
+    if values is not None:
+        marker.update(
+            color=np.asarray(values),
+            colorscale=_colorscale(coll.get_cmap()),
+            cmin=coll.norm.vmin,
+            cmax=coll.norm.vmax,
+        )
+    else:
+        face_colors = coll.get_facecolors()
+        if len(face_colors) == 1:
+            marker["color"] = _color(face_colors[0])
+        else:
+            marker["color"] = [_color(c_color) for c_color in face_colors]
+    if coll.get_alpha() is not None:
+        marker["opacity"] = coll.get_alpha()
+    return dict(
+        type="scatter", mode="markers", x=offsets[:, 0], y=offsets[:, 1], marker=marker
+    )
+
+
+def _image_trace(image):
+    img_data = np.asarray(image.get_array())
+    left, right, bottom, top = image.get_extent()
+    n_rows, n_cols = img_data.shape[:2]
+    d_x = (right - left) / n_cols
+    if image.origin == "upper":
+        d_y, y_start = (bottom - top) / n_rows, top
+    else:
+        d_y, y_start = (top - bottom) / n_rows, bottom
+    position = dict(x0=left + d_x / 2, dx=d_x, y0=y_start + d_y / 2, dy=d_y)
+    if img_data.ndim == 3:
+        if img_data.dtype != np.uint8:
+            img_data = (255 * np.clip(img_data, 0, 1)).astype(np.uint8)
+        return dict(
+            type="image",
+            z=img_data,
+            colormodel="rgba" if img_data.shape[2] == 4 else "rgb",
+            **position
+        )
+    return dict(
+        type="heatmap",
+        z=np.ma.filled(img_data.astype(float), np.nan),
+        colorscale=_colorscale(image.get_cmap()),
+        zmin=image.norm.vmin,
+        zmax=image.norm.vmax,
+        showscale=False,
+        **position
+    )
+
+
+def _bar_trace(container):
+    patches = container.patches
+    x_pos = np.array([c_rect.get_x() for c_rect in patches])
+    y_pos = np.array([c_rect.get_y() for c_rect in patches])
+    widths = np.array([c_rect.get_width() for c_rect in patches])
+    heights = np.array([c_rect.get_height() for c_rect in patches])
+    colors = [_color(c_rect.get_facecolor()) for c_rect in patches]
+    if getattr(container, "orientation", "vertical") == "horizontal":
+        trace = dict(
+            orientation="h", x=widths, y=y_pos + heights / 2, width=heights, base=x_pos
+        )
+    else:
+        trace = dict(x=x_pos + widths / 2, y=heights, width=widths, base=y_pos)
+    trace.update(
+        type="bar",
+        marker=dict(color=colors[0] if len(set(colors)) == 1 else colors),
+    )
+    return trace
+
+
+def _axis(ax, axis_name, domain):
+    scale = getattr(ax, "get_{}scale".format(axis_name))()
+    lims = getattr(ax, "get_{}lim".format(axis_name))()
+    if scale not in ("linear", "log"):
+        raise UnsupportedArtist("{} scale".format(scale))
+    if getattr(ax, "{}axis".format(axis_name)).converter is not None:
+        raise UnsupportedArtist("dates, categories or units on the axis")
+    if scale == "log":
+        lims = np.log10(lims)
+    return dict(
+        type=scale,
+        range=[float(lims[0]), float(lims[1])],
+        domain=domain,
+        title=dict(text=getattr(ax, "get_{}label".format(axis_name))()),
+        showgrid=False,
+        zeroline=False,
+    )
+
+
+def _axes_traces(ax):
+    """The traces and text of one axes (raises UnsupportedArtist)"""
+    traces = []
+    bar_patches = set()
+    for container in ax.containers:
+        if not isinstance(container, BarContainer):
+            raise UnsupportedArtist(type(container).__name__)
+        if not container.patches:  # ax.bar([], []) draws nothing
+            continue
+        traces += [(container, _bar_trace(container))]
+        bar_patches.update(id(c_rect) for c_rect in container.patches)
+    for patch in ax.patches:
+        if id(patch) not in bar_patches or not isinstance(patch, Rectangle):
+            raise UnsupportedArtist(type(patch).__name__)
+    for image in ax.images:
+        if type(image) is not AxesImage:  # not subclasses like NonUniformImage
+            raise UnsupportedArtist(type(image).__name__)
+        traces += [(image, _image_trace(image))]
+    for coll in ax.collections:
+        if not isinstance(coll, PathCollection):
+            raise UnsupportedArtist(type(coll).__name__)
+        traces += [(coll, _scatter_trace(coll, ax))]
+    for line in ax.lines:
+        traces += [(line, _line_trace(line, ax))]
+    if ax.texts or ax.artists or ax.tables:
+        raise UnsupportedArtist("texts, tables or other artists")
+    # draw in the same order as matplotlib (containers are not artists)
+    traces.sort(
+        key=lambda c_trace: getattr(c_trace[0], "patches", [c_trace[0]])[0].get_zorder()
+    )
+    out_traces = []
+    for artist, trace in traces:
+        if trace["type"] != "image":
+            trace["name"] = _label(artist)
+            trace["showlegend"] = trace["name"] is not None
+        out_traces += [trace]
+    return out_traces
+
+
+def mpl_to_figure(in_fig):
+    # type: (...) -> Dict[str, Any]
+    """Convert a figure with lines, scatter plots, images and bars reading
+    the numpy arrays directly (the arrays are kept as they are so the json
+    encoder can serialize them in one go)
+    :raises UnsupportedArtist: for anything else (see mpl_to_plotly)
+    >>> from matplotlib.figure import Figure
+    >>> fig = Figure(figsize=(4, 3), dpi=100)
+    >>> ax1 = fig.add_subplot(111)
+    >>> _ = ax1.plot([0, 1, 2], [1, 0, 1], "r--", label="line")
+    >>> _ = ax1.set_xlabel("time")
+    >>> out_fig = mpl_to_figure(fig)
+    >>> trace = out_fig["data"][0]
+    >>> trace["type"], trace["mode"], trace["line"]["dash"], trace["y"].tolist()
+    ('scatter', 'lines', 'dash', [1.0, 0.0, 1.0])
+    >>> out_fig["layout"]["xaxis"]["title"], out_fig["layout"]["width"]
+    ({'text': 'time'}, 400.0)
+    >>> _ = ax1.bar([], [])
+    >>> [c_trace["type"] for c_trace in mpl_to_figure(fig)["data"]]
+    ['scatter']
+    >>> _ = ax1.axhline(2.5)
+    >>> mpl_to_figure(fig)
+    Traceback (most recent call last):
+    ...
+    easy_dash.mpl_plotly.UnsupportedArtist: line is not in data coordinates
+    """
+    data = []
+    layout = dict(
+        width=in_fig.get_figwidth() * in_fig.dpi,
+        height=in_fig.get_figheight() * in_fig.dpi,
+        # the axes domains already leave room for the labels
+        margin=dict(l=0, r=0, t=0, b=0),
+        showlegend=False,
+        paper_bgcolor=_color(in_fig.get_facecolor()),
+    )
+    if in_fig.axes:
+        layout["plot_bgcolor"] = _color(in_fig.axes[0].get_facecolor())
+    positions = set()
+    for ax_idx, ax in enumerate(in_fig.axes):
+        if ax.name != "rectilinear":
+            raise UnsupportedArtist("{} axes".format(ax.name))
+        bounds = ax.get_position().bounds
+        if bounds in positions:
+            raise UnsupportedArtist("overlapping (twin) axes")
+        positions.add(bounds)
+        x_0, y_0, width, height = bounds
+        suffix = "" if ax_idx == 0 else str(ax_idx + 1)
+        x_name, y_name = "x" + suffix, "y" + suffix
+        layout["xaxis" + suffix] = dict(
+            _axis(ax, "x", [x_0, x_0 + width]), anchor=y_name
+        )
+        layout["yaxis" + suffix] = dict(
+            _axis(ax, "y", [y_0, y_0 + height]), anchor=x_name
+        )
+        for trace in _axes_traces(ax):
+            trace.update(xaxis=x_name, yaxis=y_name)
+            data += [trace]
+        if ax.get_legend() is not None:
+            layout["showlegend"] = True
+        if ax.get_title():
+            layout.setdefault("annotations", []).append(
+                dict(
+                    text=ax.get_title(),
+                    xref="paper",
+                    yref="paper",
+                    x=x_0 + width / 2,
+                    y=y_0 + height,
+                    xanchor="center",
+                    yanchor="bottom",
+                    showarrow=False,
+                )
+            )
+    suptitle = getattr(in_fig, "_suptitle", None)
+    if suptitle is not None and suptitle.get_text():
+        layout["title"] = dict(text=suptitle.get_text())
+    return dict(data=data, layout=layout)
+
+
+def mpl_to_plotly(in_fig):
+    """Convert with mpl_to_figure and fall back to plotly.tools.mpl_to_plotly
+    for figures it does not support"""
+    try:
+        return mpl_to_figure(in_fig)
+    except UnsupportedArtist:
+        import plotly.tools as tls
+
+        return tls.mpl_to_plotly(in_fig)
@@ -0,0 +1,161 @@
+"""Render matplotlib figures in a pool of worker processes"""
+from __future__ import print_function
+
+import importlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from .aio import as_sync
+from .viz import FigureFactory, fig_to_bytes
+
+# the figure functions by key, workers look them up here (or re-import the
+# module that defines them when they were started with spawn)
+_RENDER_FUNCS = {}  # type: Dict[str, Callable]
+
+
+class RenderTimeout(RuntimeError):
+    """The render took longer than the allowed time"""
+
+
+class RenderQueueFull(RuntimeError):
+    """Too many renders are waiting for a worker"""
+
+
+def register_render_func(func):
+    # type: (Callable) -> str
+    """Register a figure function so worker processes can find it.
+    >>> def update_plot(value_of_size): pass
+    >>> register_render_func(update_plot)
+    'easy_dash.render:update_plot'
+    """
+    key = "{}:{}".format(func.__module__, func.__name__)
+    _RENDER_FUNCS[key] = func
+    return key
+
+
+def _load_render_func(key):
+    if key not in _RENDER_FUNCS:
+        module_name, func_name = key.split(":", 1)
+        if module_name == "__main__":
+            # spawned workers import the main script as __mp_main__
+            module_name = "__mp_main__"
+        importlib.import_module(module_name)
+        key = "{}:{}".format(module_name, func_name)
+    return _RENDER_FUNCS[key]
+
+
+def _call_render_func(key, *args):
+    """Runs inside the worker: call a registered function"""
+    return as_sync(_load_render_func(key))(*args)
+
+
+def _render_job(key, args, img_format, dpi, save_args):
+    # type: (...) -> bytes
+    """Runs inside the worker: build the figure and encode it"""
+    func = as_sync(_load_render_func(key))
+    with FigureFactory():
+        out_fig = func(*args)
+        img_bytes = fig_to_bytes(out_fig, img_format=img_format, dpi=dpi, **save_args)
+        if getattr(out_fig.canvas, "manager", None) is not None:
+            # made with pyplot, which only affects this worker process
+            from matplotlib import pyplot as plt
+
+            plt.close(out_fig)
+        else:
+            out_fig.clf()
+    return img_bytes
+
+
+class ProcessRenderer(object):
+    """A managed process pool for rendering figures to encoded bytes.
+
+    At most max_pending renders are submitted or running at once, a render
+    waits up to timeout seconds for a free slot and again for its result.
+    Python cannot stop a render which is already running in a worker so a
+    timed out render keeps its slot until it actually finishes.
+    """
+
+    def __init__(
+        self,
+        workers=None,  # type: Optional[int]
+        max_pending=None,  # type: Optional[int]
+        timeout=None,  # type: Optional[float]
+    ):
+        """
+        :param workers: the number of processes (default is the number of cores)
+        :param max_pending: the number of renders in flight (default 2*workers)
+        :param timeout: the maximum seconds to wait for each render
+        """
+        if workers is None:
+            import multiprocessing
+
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.max_pending = 2 * workers if max_pending is None else max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None  # type: Optional[ProcessPoolExecutor]
+        self._pid = None  # type: Optional[int]
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # type: () -> ProcessPoolExecutor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # the pool of the parent does not survive a fork (serve), its
+                # management thread is gone and its slots belong to the parent
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, key, args, img_format="png", dpi=None, timeout=None, **save_args):
+        """Queue a render and return its future
+        :param key: the key from register_render_func
+        :param args: the arguments for the figure function
+        :param timeout: overrides the timeout of the renderer
+        :raises RenderQueueFull: when no slot frees up within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        executor = self._get_executor()
+        if timeout is None:
+            acquired = self._slots.acquire()
+        else:
+            acquired = self._slots.acquire(timeout=timeout)
+        if not acquired:
+            raise RenderQueueFull(
+                "{} renders already pending for {}".format(self.max_pending, key)
+            )
+        try:
+            future = executor.submit(
+                _render_job, key, tuple(args), img_format, dpi, save_args
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def render(self, key, args, img_format="png", dpi=None, timeout=None, **save_args):
+        # type: (...) -> bytes
+        """Render in a worker process and wait for the encoded image
+        :raises RenderTimeout: when the render takes longer than the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(
+            key, args, img_format=img_format, dpi=dpi, timeout=timeout, **save_args
+        )
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise RenderTimeout("Rendering {} took more than {}s".format(key, timeout))
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,203 @@
+"""A preforking, multi-threaded WSGI server for running apps on every core"""
+from __future__ import print_function
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, select_address_family
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """A werkzeug server which handles requests with a fixed pool of threads
+    and stops gracefully (finishing the requests in flight)"""
+
+    def __init__(self, host, port, app, threads=4, max_requests=0, fd=None):
+        super(PooledWSGIServer, self).__init__(host, port, app, fd=fd)
+        self.threads = threads
+        self.max_requests = max_requests
+        self.request_count = 0
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self._stopping = False
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+        self.request_count += 1
+        if self.max_requests and self.request_count >= self.max_requests:
+            # recycle the worker, the master starts a fresh one
+            self.stop()
+
+    def stop(self):
+        """Stop accepting requests (safe to call from a signal handler)"""
+        if not self._stopping:
+            self._stopping = True
+            threading.Thread(target=self.shutdown).start()
+
+    def serve(self):
+        try:
+            self.serve_forever()
+        finally:
+            self._pool.shutdown(wait=True)
+
+
+def bind_socket(host, port, backlog=2048):
+    """Create the listening socket which is shared by all of the workers"""
+    address_family = select_address_family(host, port)
+    sock = socket.socket(address_family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+class PreforkServer(object):
+    """Run a WSGI app in several forked worker processes sharing one socket.
+
+    The master process restarts workers that die or reach max_requests.
+    SIGHUP does a graceful restart: new workers are started before the old
+    ones finish their requests and exit. SIGTERM and SIGINT stop everything,
+    killing workers which are still busy after graceful_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        app,
+        host="0.0.0.0",
+        port=8050,
+        workers=None,
+        threads=4,
+        max_requests=0,
+        graceful_timeout=30,
+        on_worker_start=(),
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.on_worker_start = list(on_worker_start)
+        self.socket = None
+        self._children = {}  # type: Dict[int, int]
+        self._generation = 0
+        self._stopping = False
+        self._reload = False
+
+    def _run_worker(self):
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        server = PooledWSGIServer(
+            self.host,
+            self.port,
+            self.app,
+            threads=self.threads,
+            max_requests=self.max_requests,
+            fd=self.socket.fileno(),
+        )
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+        for hook in self.on_worker_start:
+            hook()
+        server.serve()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker()
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+        self._children[pid] = self._generation
+
+    def _reap(self):
+        while self._children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except OSError:  # no children left
+                return
+            if pid == 0:
+                return
+            generation = self._children.pop(pid, None)
+            if generation == self._generation and not self._stopping:
+                self._spawn()
+
+    def restart(self):
+        """Gracefully replace all of the workers"""
+        old_pids = list(self._children)
+        self._generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+        for pid in old_pids:
+            self._kill(pid, signal.SIGTERM)
+
+    def stop(self):
+        self._stopping = True
+        for pid in list(self._children):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while self._children and time.time() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._children):
+            self._kill(pid, signal.SIGKILL)
+            self._reap()
+
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError:  # already gone
+            self._children.pop(pid, None)
+
+    def _on_signal(self, signum, _):
+        if signum == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stopping = True
+
+    def run(self):
+        if not hasattr(os, "fork"):
+            # no fork (windows), so just run the threaded server
+            server = PooledWSGIServer(self.host, self.port, self.app, self.threads)
+            for hook in self.on_worker_start:
+                hook()
+            return server.serve()
+        self.socket = bind_socket(self.host, self.port)
+        print(
+            " * Serving on http://{}:{} with {} workers x {} threads".format(
+                self.host, self.socket.getsockname()[1], self.workers, self.threads
+            )
+        )
+        for c_sig in [signal.SIGHUP, signal.SIGTERM, signal.SIGINT]:
+            signal.signal(c_sig, self._on_signal)
+        for _ in range(self.workers):
+            self._spawn()
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self.restart()
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            self.stop()
+            self.socket.close()
@@ -0,0 +1,108 @@
+"""Append-only updates of live time series through extendData"""
+from __future__ import print_function
+
+import threading
+from functools import wraps
+
+import numpy as np
+from dash.exceptions import PreventUpdate
+
+
+class RingBuffer(object):
+    """The last capacity points of one or more traces, every point gets a
+    sequence number so readers only fetch what they have not seen yet
+    >>> buffer = RingBuffer(capacity=4)
+    >>> buffer.extend([0, 1, 2], [10, 11, 12])
+    >>> x, y, cursor = buffer.since(0)
+    >>> x.tolist(), y.tolist(), cursor
+    ([0.0, 1.0, 2.0], [10.0, 11.0, 12.0], 3)
+    >>> buffer.extend([3, 4, 5], [13, 14, 15])
+    >>> x, y, cursor = buffer.since(cursor)
+    >>> x.tolist(), cursor
+    ([3.0, 4.0, 5.0], 6)
+    >>> buffer.since(0)[0].tolist()  # only the last 4 points are kept
+    [2.0, 3.0, 4.0, 5.0]
+    """
+
+    def __init__(self, capacity=100000, n_traces=1, dtype=np.float64):
+        self.capacity = capacity
+        self.n_traces = n_traces
+        self._x = np.zeros((n_traces, capacity), dtype=dtype)
+        self._y = np.zeros((n_traces, capacity), dtype=dtype)
+        self._count = [0] * n_traces  # points ever added to each trace
+        self._lock = threading.Lock()
+
+    def append(self, x, y, trace=0):
+        """Add a single point"""
+        self.extend([x], [y], trace=trace)
+
+    def extend(self, x, y, trace=0):
+        """Add several points to a trace (older points are dropped)"""
+        x = np.asarray(x)[-self.capacity :]
+        y = np.asarray(y)[-self.capacity :]
+        with self._lock:
+            start = self._count[trace] % self.capacity
+            split = min(len(x), self.capacity - start)
+            self._x[trace, start : start + split] = x[:split]
+            self._y[trace, start : start + split] = y[:split]
+            self._x[trace, : len(x) - split] = x[split:]
+            self._y[trace, : len(y) - split] = y[split:]
+            self._count[trace] += len(x)
+
+    def since(self, cursor, trace=0, max_points=None):
+        """The points after cursor (at most max_points of the newest ones)
+        :return: x, y and the cursor for the next call
+        """
+        with self._lock:
+            count = self._count[trace]
+            n_new = min(count - cursor, self.capacity, max_points or self.capacity)
+            idx = np.arange(count - n_new, count) % self.capacity
+            return self._x[trace, idx], self._y[trace, idx], count
+
+    def __len__(self):
+        return min(max(self._count), self.capacity)
+
+
+def stream_updates(func, name, max_points=1000):
+    """Wrap a callback returning a RingBuffer so it returns the extendData of
+    the points a page has not received yet. The wrapped callback takes the
+    cursors of the page (kept in a dcc.Store, None for a new page) after the
+    arguments of func and also returns the new cursors.
+    :param max_points: the points kept on the client for each trace
+    >>> buffer = RingBuffer(capacity=10)
+    >>> buffer.extend([0, 1], [5, 6])
+    >>> streaming_func = stream_updates(lambda n_intervals: buffer, "update")
+    >>> (update, trace_idx, _), cursors = streaming_func(1, None)
+    >>> update["y"][0].tolist(), trace_idx, cursors
+    ([5.0, 6.0], [0], [2])
+    >>> buffer.append(2, 7)
+    >>> streaming_func(2, cursors)[0][0]["y"][0].tolist()
+    [7.0]
+    """
+
+    @wraps(func)
+    def streaming_func(*args):
+        buffer = func(*args[:-1])
+        if not isinstance(buffer, RingBuffer):
+            raise ValueError(
+                "{} must return a RingBuffer, not {}".format(name, type(buffer))
+            )
+        cursors = args[-1]
+        if cursors is None or len(cursors) != buffer.n_traces:
+            # a new page, it gets the most recent points
+            cursors = [0] * buffer.n_traces
+        update = dict(x=[], y=[])
+        trace_idx = []
+        new_cursors = []
+        for trace, c_cursor in enumerate(cursors):
+            x, y, c_cursor = buffer.since(c_cursor, trace, max_points=max_points)
+            new_cursors += [c_cursor]
+            if len(x) > 0:
+                update["x"] += [x]
+                update["y"] += [y]
+                trace_idx += [trace]
+        if not trace_idx:
+            raise PreventUpdate
+        return [[update, trace_idx, max_points], new_cursors]
+
+    return streaming_func
@@ -0,0 +1,214 @@
+"""Tiled multi-resolution views of large 2D arrays"""
+from __future__ import print_function
+from __future__ import division
+
+import json
+import math
+import uuid
+
+import numpy as np
+
+from .cache import ResultCache
+from .images import TILE_ROUTE  # noqa: F401
+from .viz import (
+    ImageEncoder,
+    _normalize,
+    apply_lut,
+    as_encoder,
+    block_reduce,
+    colormap_lut,
+    sample_stats,
+)
+
+
+class TilePyramid(object):
+    """Lazily computed and cached image tiles of an array at several zoom levels.
+
+    Level max_level is the full resolution and every level below halves it
+    until the whole image fits in a single tile at level 0.
+    >>> pyramid = TilePyramid(np.random.uniform(size=(1000, 600)), tile_size=256)
+    >>> pyramid.max_level
+    2
+    >>> pyramid.tile_counts(0), pyramid.tile_counts(2)
+    ((1, 1), (4, 3))
+    >>> pyramid.tile(2, 3, 2)[:4]
+    b'\\x89PNG'
+    >>> pyramid.tile(2, 4, 0) is None
+    True
+    >>> from io import BytesIO
+    >>> from PIL import Image as PImage
+    >>> thin = TilePyramid(np.random.uniform(size=(600, 1025)), tile_size=256)
+    >>> PImage.open(BytesIO(thin.tile(2, 1, 2))).size
+    (1, 44)
+    >>> PImage.open(BytesIO(thin.tile(1, 0, 1))).size
+    (1, 150)
+    """
+
+    def __init__(
+        self,
+        in_array,  # type: np.ndarray
+        tile_size=256,  # type: int
+        cmap="RdBu",  # type: str
+        do_norm=True,  # type: bool
+        encoder=None,  # type: Optional[ImageEncoder]
+        cache=None,
+        sample_size=2 ** 20,  # type: int
+    ):
+        """
+        :param in_array: a 2D array (or memmap, h5py dataset, ...)
+        :param tile_size: the width and height of the tiles
+        :param cmap: the color map to use
+        :param do_norm: normalize (with the statistics of the whole array)
+        :param encoder: the ImageEncoder (or format name) for the tiles
+        :param cache: where encoded tiles are kept (default is LRU of 1024)
+        :param sample_size: the number of values for the normalization statistics
+        """
+        self.in_array = in_array
+        self.shape = tuple(np.shape(in_array)[0:2])
+        self.tile_size = tile_size
+        self.max_level = max(
+            0, int(math.ceil(math.log(max(self.shape) / tile_size, 2)))
+        )
+        self.lut = colormap_lut(cmap)
+        self.stats = sample_stats(in_array, sample_size) if do_norm else None
+        self.encoder = as_encoder(encoder) or ImageEncoder("png")
+        self.cache = ResultCache(max_size=1024) if cache is None else cache
+        # changes whenever the data does so browsers can cache tiles forever
+        self.token = uuid.uuid4().hex[:12]
+
+    def _scale(self, level):
+        # type: (int) -> int
+        return 2 ** (self.max_level - level)
+
+    def tile_counts(self, level):
+        # type: (int) -> Tuple[int, int]
+        """The number of tile rows and columns at a level"""
+        span = self.tile_size * self._scale(level)
+        return tuple(int(math.ceil(c_dim / span)) for c_dim in self.shape)
+
+    def tile(self, level, row, col):
+        # type: (int, int, int) -> Optional[bytes]
+        """The encoded tile (None if it is outside of the image)"""
+        if not 0 <= level <= self.max_level:
+            return None
+        n_rows, n_cols = self.tile_counts(level)
+        if not (0 <= row < n_rows and 0 <= col < n_cols):
+            return None
+        key = (level, row, col)
+        img_bytes = self.cache.get(key)
+        if img_bytes is None:
+            img_bytes = self._render_tile(level, row, col)
+            self.cache.set(key, img_bytes)
+        return img_bytes
+
+    def _render_tile(self, level, row, col):
+        # type: (int, int, int) -> bytes
+        scale = self._scale(level)
+        span = self.tile_size * scale
+        region = self.in_array[
+            row * span : (row + 1) * span, col * span : (col + 1) * span
+        ]
+        # edge regions can be thinner than a block along one axis
+        factors = tuple(min(scale, c_dim) for c_dim in np.shape(region)[0:2])
+        if max(factors) > 1:
+            tile_data = block_reduce(region, factors)
+        else:
+            tile_data = np.array(region, dtype=np.float32)
+        if self.stats is not None:
+            tile_data = _normalize(tile_data, stats=self.stats)
+        from PIL import Image as PImage
+
+        return self.encoder.encode(PImage.fromarray(apply_lut(tile_data, self.lut)))
+
+    def viewer_config(self, tile_url):
+        # type: (str) -> Dict[str, Any]
+        """The settings the browser viewer needs"""
+        return dict(
+            url=tile_url,
+            height=self.shape[0],
+            width=self.shape[1],
+            tile_size=self.tile_size,
+            max_level=self.max_level,
+        )
+
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html><head><style>
+html, body {margin: 0; height: 100%; overflow: hidden; background: #fff}
+canvas {display: block; cursor: grab}
+</style></head><body><canvas id="view"></canvas><script>
+var cfg = __CONFIG__;
+var canvas = document.getElementById("view"), ctx = canvas.getContext("2d");
+var tiles = {}, zoom = 1, offX = 0, offY = 0, drag = null;
+function tileImg(level, row, col) {
+  var key = level + "/" + row + "/" + col;
+  if (!(key in tiles)) {
+    var img = new Image();
+    img.onload = draw;
+    img.src = cfg.url + key;
+    tiles[key] = img;
+  }
+  return tiles[key];
+}
+function drawLevel(level) {
+  var span = cfg.tile_size * Math.pow(2, cfg.max_level - level);
+  var x0 = Math.max(0, Math.floor(-offX / zoom / span));
+  var y0 = Math.max(0, Math.floor(-offY / zoom / span));
+  var x1 = Math.min(Math.ceil(cfg.width / span), Math.ceil((canvas.width - offX) / zoom / span));
+  var y1 = Math.min(Math.ceil(cfg.height / span), Math.ceil((canvas.height - offY) / zoom / span));
+  var pix = span / cfg.tile_size * zoom;
+  for (var row = y0; row < y1; row++) {
+    for (var col = x0; col < x1; col++) {
+      var img = tileImg(level, row, col);
+      if (img.complete && img.naturalWidth) {
+        ctx.drawImage(img, offX + col * span * zoom, offY + row * span * zoom,
+                      img.naturalWidth * pix, img.naturalHeight * pix);
+      }
+    }
+  }
+}
+function draw() {
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  var level = Math.ceil(cfg.max_level + Math.log(zoom) / Math.LN2);
+  level = Math.max(0, Math.min(cfg.max_level, level));
+  // the coarse level stays underneath while the finer tiles load
+  drawLevel(0);
+  if (level > 0) { drawLevel(level); }
+}
+function fit() {
+  canvas.width = window.innerWidth;
+  canvas.height = window.innerHeight;
+  zoom = Math.min(canvas.width / cfg.width, canvas.height / cfg.height);
+  offX = (canvas.width - cfg.width * zoom) / 2;
+  offY = (canvas.height - cfg.height * zoom) / 2;
+  draw();
+}
+canvas.addEventListener("wheel", function (evt) {
+  evt.preventDefault();
+  var factor = evt.deltaY < 0 ? 1.25 : 0.8;
+  offX = evt.offsetX - (evt.offsetX - offX) * factor;
+  offY = evt.offsetY - (evt.offsetY - offY) * factor;
+  zoom *= factor;
+  draw();
+});
+canvas.addEventListener("mousedown", function (evt) {
+  drag = [evt.clientX - offX, evt.clientY - offY];
+});
+window.addEventListener("mouseup", function () { drag = null; });
+window.addEventListener("mousemove", function (evt) {
+  if (drag) { offX = evt.clientX - drag[0]; offY = evt.clientY - drag[1]; draw(); }
+});
+canvas.addEventListener("dblclick", fit);
+window.addEventListener("resize", fit);
+fit();
+</script></body></html>
+"""
+
+
+def viewer_html(config):
+    # type: (Dict[str, Any]) -> str
+    """A standalone page which pans and zooms over the tiles
+    >>> "new Image()" in viewer_html(dict(url="/tiles/", width=5, height=5))
+    True
+    """
+    return VIEWER_HTML.replace("__CONFIG__", json.dumps(config))
@@ -2,29 +2,258 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import division
 import base64
+import threading
+import time
 from io import BytesIO
 
 import numpy as np
-from PIL import Image as PImage
-from matplotlib import pyplot as plt
-from matplotlib.pyplot import cm
+
+# matplotlib and PIL are imported when they are first used since they make
+# importing easy_dash (and starting every worker) much slower
+
+_FACTORY_STATE = threading.local()
+
+
+def _agg_figure(**fig_args):
+    # type: (...) -> Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(**fig_args)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+class FigureFactory(object):
+    """Creates standalone Agg figures which never touch the global pyplot state.
+
+    Used as a context manager the factory becomes the active one for the
+    current thread (so new_figure registers with it) and clears every figure
+    it made on exit, which makes it safe to render in several threads at once.
+    >>> with FigureFactory() as factory:
+    ...     fig = new_figure(figsize=(2, 2))
+    ...     len(factory.figures)
+    1
+    >>> len(factory.figures)
+    0
+    """
+
+    def __init__(self):
+        self.figures = []  # type: List[Figure]
+        self._previous = None  # type: Optional[FigureFactory]
+
+    def figure(self, **fig_args):
+        # type: (...) -> Figure
+        """Create a new figure (arguments are the same as plt.figure)"""
+        fig = _agg_figure(**fig_args)
+        self.figures.append(fig)
+        return fig
+
+    def close(self):
+        """Clear all of the figures made by this factory"""
+        for fig in self.figures:
+            fig.clf()
+        self.figures = []
+
+    def __enter__(self):
+        self._previous = getattr(_FACTORY_STATE, "factory", None)
+        _FACTORY_STATE.factory = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _FACTORY_STATE.factory = self._previous
+        self.close()
+
+
+def new_figure(**fig_args):
+    # type: (...) -> Figure
+    """Create a figure without pyplot using the active FigureFactory (if any)
+    >>> fig = new_figure(figsize=(4, 3), dpi=50)
+    >>> ax1 = fig.add_subplot(111)
+    >>> print(fig_to_uri(fig, close_all=False)[:22])
+    data:image/png;base64,
+    """
+    factory = getattr(_FACTORY_STATE, "factory", None)
+    if factory is None:
+        return _agg_figure(**fig_args)
+    return factory.figure(**fig_args)
+
+
+_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "svg": "image/svg+xml",
+}
+
+
+class ImageEncoder(object):
+    """Encodes images with a given format and settings
+    >>> enc = ImageEncoder("webp", quality=70)
+    >>> enc
+    ImageEncoder(img_format='webp', quality=70, compress_level=None, quantize=None)
+    >>> enc.mimetype
+    'image/webp'
+    >>> from PIL import Image as PImage
+    >>> img = PImage.fromarray(np.zeros((8, 8, 4), dtype=np.uint8))
+    >>> ImageEncoder("jpeg").encode(img)[:3]
+    b'\\xff\\xd8\\xff'
+    >>> ImageEncoder("png", quantize=16).encode(img)[:4]
+    b'\\x89PNG'
+    >>> ImageEncoder("jpeg", quantize=16)
+    Traceback (most recent call last):
+     ...
+    ValueError: jpeg has no palette mode, quantize needs png, gif or webp
+    """
+
+    def __init__(
+        self,
+        img_format="png",  # type: str
+        quality=None,  # type: Optional[int]
+        compress_level=None,  # type: Optional[int]
+        quantize=None,  # type: Optional[int]
+        alpha=True,  # type: bool
+    ):
+        """
+        :param img_format: the file-format (png, jpeg, webp or anything PIL saves)
+        :param quality: the quality of lossy formats (1-100)
+        :param compress_level: the zlib level for png (0-9, lower is faster)
+        :param quantize: the number of palette colors to reduce the image to
+        (not for jpeg)
+        :param alpha: if the alpha channel should be included
+        """
+        if quantize and img_format.lower() in ("jpeg", "jpg"):
+            raise ValueError(
+                "{} has no palette mode, quantize needs png, gif or webp".format(
+                    img_format
+                )
+            )
+        self.img_format = img_format.lower()
+        self.quality = quality
+        self.compress_level = compress_level
+        self.quantize = quantize
+        self.alpha = alpha
+
+    def __repr__(self):
+        return "ImageEncoder(img_format={!r}, quality={!r}, compress_level={!r}, quantize={!r})".format(
+            self.img_format, self.quality, self.compress_level, self.quantize
+        )
+
+    @property
+    def mimetype(self):
+        # type: () -> str
+        return _MIME_TYPES.get(self.img_format, "image/" + self.img_format)
+
+    def save_args(self):
+        # type: () -> Dict[str, Any]
+        """The keyword arguments for PIL.Image.save"""
+        args = {}  # type: Dict[str, Any]
+        if self.quality is not None:
+            args["quality"] = self.quality
+        if self.compress_level is not None:
+            args["compress_level"] = self.compress_level
+        return args
+
+    def encode(self, in_img):
+        # type: (PImage.Image) -> bytes
+        """Encode a PIL image"""
+        if self.img_format in ("jpeg", "jpg") or not self.alpha:
+            in_img = in_img.convert("RGB")
+        if self.quantize:
+            # fast octree (method 2) is the only method which supports RGBA
+            in_img = in_img.quantize(colors=self.quantize, method=2)
+        out_img = BytesIO()
+        in_img.save(out_img, format=self.img_format, **self.save_args())
+        return out_img.getvalue()
+
+
+def as_encoder(encoder):
+    # type: (Union[None, str, ImageEncoder]) -> Optional[ImageEncoder]
+    """Accept an encoder or just the name of a format
+    >>> as_encoder("jpeg")
+    ImageEncoder(img_format='jpeg', quality=None, compress_level=None, quantize=None)
+    """
+    if encoder is None or isinstance(encoder, ImageEncoder):
+        return encoder
+    return ImageEncoder(encoder)
+
+
+def fig_to_image(
+    in_fig,  # type: Figure
+    dpi=None,
+):
+    # type: (...) -> PImage.Image
+    """Rasterize a figure with Agg into an RGBA PIL image
+    >>> fig_to_image(new_figure(figsize=(2, 3)), dpi=10).size
+    (20, 30)
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from PIL import Image as PImage
+
+    canvas = in_fig.canvas
+    if not isinstance(canvas, FigureCanvasAgg):
+        canvas = FigureCanvasAgg(in_fig)
+    orig_dpi = in_fig.dpi
+    if dpi is not None:
+        in_fig.dpi = dpi
+    try:
+        raw_data, size = canvas.print_to_buffer()
+    finally:
+        in_fig.dpi = orig_dpi
+    return PImage.frombuffer("RGBA", size, raw_data, "raw", "RGBA", 0, 1)
+
+
+def fig_to_bytes(
+    in_fig,  # type: Figure
+    img_format="png",  # type: str
+    dpi=None,
+    encoder=None,  # type: Union[None, str, ImageEncoder]
+    **save_args
+):
+    # type: (...) -> bytes
+    """Render a figure to an encoded image without touching pyplot
+    :param in_fig: the figure to save
+    :param img_format: the file-format to save as
+    :param dpi: specify the DPI if desired
+    :param encoder: rasterize with Agg and encode with this ImageEncoder
+    (save_args are not used in this case)
+    :param save_args: arguments to save with
+    :return: the encoded image
+    >>> fig = new_figure(figsize=(2, 2))
+    >>> fig_to_bytes(fig, dpi=10)[:4]
+    b'\\x89PNG'
+    >>> fig_to_bytes(fig, dpi=10, encoder="jpeg")[:3]
+    b'\\xff\\xd8\\xff'
+    """
+    encoder = as_encoder(encoder)
+    if encoder is not None:
+        return encoder.encode(fig_to_image(in_fig, dpi=dpi))
+    out_img = BytesIO()
+    in_fig.savefig(out_img, format=img_format, dpi=dpi, **save_args)
+    return out_img.getvalue()
 
 
 def fig_to_uri(
     in_fig,  # type: plt.Figure
     close_all=True,
     dpi=None,
+    encoder=None,  # type: Union[None, str, ImageEncoder]
     **save_args
 ):
     # type: (...) -> str
     """Save a figure as a URI
     :param in_fig: the figure to save
-    :param close_all: close all other figures afterwards
+    :param close_all: close all other figures afterwards (this uses pyplot so
+    turn it off when rendering from several threads)
     :param dpi: specify the DPI if desired
+    :param encoder: an ImageEncoder (or format name) to use instead of savefig
     :param save_args: arguments to save with
     :return:
     >>> import matplotlib
     >>> matplotlib.use('Agg')
+    >>> from matplotlib import pyplot as plt
     >>> fig, ax1 = plt.subplots(1, 1, figsize=(4,6))
     >>> lowres_str = fig_to_uri(fig, close_all=True, dpi=50)
     >>> print(lowres_str[:50])
@@ -33,15 +262,62 @@ def fig_to_uri(
     >>> highres_str = fig_to_uri(fig, close_all = True, dpi=100)
     >>> print(highres_str[:50])
     data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAZAA
+    >>> fig = new_figure(figsize=(4, 6))
+    >>> print(fig_to_uri(fig, close_all=False, encoder="webp")[:23])
+    data:image/webp;base64,
     """
-    out_img = BytesIO()
-    in_fig.savefig(out_img, format="png", dpi=dpi, **save_args)
+    encoder = as_encoder(encoder)
+    img_bytes = fig_to_bytes(in_fig, dpi=dpi, encoder=encoder, **save_args)
     if close_all:
-        in_fig.clf()
-        plt.close("all")
-    out_img.seek(0)  # rewind file
-    encoded = base64.b64encode(out_img.read()).decode("ascii").replace("\n", "")
-    return "data:image/png;base64,{}".format(encoded)
+        close_figures(in_fig)
+    mimetype = "image/png" if encoder is None else encoder.mimetype
+    return bytes_to_uri(img_bytes, mimetype)
+
+
+def close_figures(in_fig):
+    # type: (Figure) -> None
+    """Clear the figure and close every pyplot figure"""
+    from matplotlib import pyplot as plt
+
+    in_fig.clf()
+    plt.close("all")
+
+
+def bytes_to_uri(img_bytes, mimetype="image/png"):
+    # type: (bytes, str) -> str
+    """Wrap an encoded image as a base64 data URI
+    >>> bytes_to_uri(b"abc", "image/gif")
+    'data:image/gif;base64,YWJj'
+    """
+    encoded = base64.b64encode(img_bytes).decode("ascii").replace("\n", "")
+    return "data:{};base64,{}".format(mimetype, encoded)
+
+
+def _reduce_factor(in_shape, new_size):
+    # type: (Tuple[int, ...], Tuple[int, int]) -> Tuple[int, int]
+    """The row and column factors 2D images are shrunk by before the color
+    map, the short side of thin images is shrunk to a single pixel at most
+    >>> _reduce_factor((2048, 1024), (128, 128)), _reduce_factor((8000, 50), (128, 128))
+    ((16, 16), (62, 50))
+    >>> _reduce_factor((300, 1), (128, 128)), _reduce_factor((10, 10, 3), (128, 128))
+    ((2, 1), (1, 1))
+    >>> print(_np_to_uri(np.random.rand(8000, 50))[:20])
+    iVBORw0KGgoAAAANSUhE
+    >>> print(_np_to_uri(np.random.rand(300, 1))[:20])
+    iVBORw0KGgoAAAANSUhE
+    >>> import os, tempfile
+    >>> mm_path = os.path.join(tempfile.mkdtemp(), "frame.raw")
+    >>> mm_img = np.memmap(mm_path, dtype=np.uint16, mode="w+", shape=(2048, 1024))
+    >>> mm_img[::16] = 1000
+    >>> print(_np_to_uri(mm_img)[:20])
+    iVBORw0KGgoAAAANSUhE
+    >>> print(_np_to_uri(mm_img, reduce_mode="stride")[:20])
+    iVBORw0KGgoAAAANSUhE
+    """
+    if len(in_shape) != 2:
+        return 1, 1
+    reduce_factor = max(1, max(in_shape) // max(new_size))
+    return min(reduce_factor, in_shape[0]), min(reduce_factor, in_shape[1])
 
 
 def _np_to_uri(
@@ -51,16 +327,25 @@ def _np_to_uri(
     new_size=(128, 128),  # type: Tuple[int, int]
     img_format="png",  # type: str
     alpha=True,  # type: bool
+    encoder=None,  # type: Optional[ImageEncoder]
+    reduce_mode="mean",  # type: Optional[str]
+    sample_size=2 ** 20,  # type: int
 ):
     # type: (...) -> str
     """
     Convert a numpy array to a data URI with an encode image inside
-    :param in_array: the image to convert
+    :param in_array: the image to convert (np.memmap and other array-likes
+    with a shape and slicing are read in chunks when they are large)
     :param cmap: the color map to use
     :param do_norm: if the image should be normalized first
     :param new_size: the dimensions of the output images
     :param img_format: the file-format to save as
     :param alpha: if the alpha channel should be included
+    :param encoder: an ImageEncoder to use instead of img_format and alpha
+    :param reduce_mode: how 2D images at least twice as large as new_size
+    are shrunk before applying the color map (mean, stride or None for never)
+    :param sample_size: the number of values used for the normalization
+    statistics of these large images
     :return: the base64 string
     Examples
     ========
@@ -72,30 +357,258 @@ def _np_to_uri(
     484
     >>> len(_np_to_uri(np.zeros((100,100)), alpha = True))
     524
+    >>> print(_np_to_uri(np.eye(10), encoder=ImageEncoder("webp", quality=50))[:4])
+    UklG
+    """
+    reduce_factor = _reduce_factor(np.shape(in_array), new_size)
+    if reduce_mode is not None and max(reduce_factor) > 1:
+        # shrink first so the memory depends on new_size not the input size
+        test_img_data = block_reduce(in_array, reduce_factor, mode=reduce_mode)
+        if do_norm:
+            stats = sample_stats(in_array, sample_size=sample_size)
+            test_img_data = _normalize(test_img_data, stats=stats)
+    else:
+        test_img_data = np.array(in_array).astype(np.float32)
+        if do_norm:
+            test_img_data = _normalize(test_img_data)
+    pre_array = apply_lut(test_img_data, colormap_lut(cmap))
+    if encoder is None:
+        encoder = ImageEncoder(img_format, alpha=alpha)
+    return _encode_colored(pre_array, new_size, encoder)
+
+
+def _np_stack_to_uris(
+    in_stack,  # type: np.ndarray
+    cmap="RdBu",  # type: str
+    do_norm=True,  # type: bool
+    new_size=(128, 128),  # type: Tuple[int, int]
+    img_format="png",  # type: str
+    alpha=True,  # type: bool
+    encoder=None,  # type: Optional[ImageEncoder]
+    workers=None,  # type: Optional[int]
+):
+    # type: (...) -> List[str]
     """
-    test_img_data = np.array(in_array).astype(np.float32)
+    Convert a stack of 2D arrays (N x H x W) into N base64 encoded images,
+    the arguments are the same as _np_to_uri
+    :param workers: the number of threads to resize and encode the images with
+    :return: a list with the base64 string for each image
+    >>> t_stack = np.stack([np.eye(8) * i for i in range(1, 4)])
+    >>> uris = _np_stack_to_uris(t_stack, workers=2)
+    >>> len(uris)
+    3
+    >>> uris[2] == _np_to_uri(t_stack[2])
+    True
+    """
+    stack_data = np.array(in_stack, dtype=np.float32)
     if do_norm:
-        test_img_data -= test_img_data.mean()
-        test_img_data /= test_img_data.std()
-        test_img_data = (test_img_data + 0.5).clip(0, 1)
-    test_img_color = cm.get_cmap(cmap)(test_img_data)
-    test_img_color *= 255
-    pre_array = test_img_color.clip(0, 255).astype(np.uint8)
+        stack_data = _normalize(stack_data, axis=tuple(range(1, stack_data.ndim)))
+    color_stack = apply_lut(stack_data, colormap_lut(cmap))
+    if encoder is None:
+        encoder = ImageEncoder(img_format, alpha=alpha)
+
+    def encode_slice(pre_array):
+        return _encode_colored(pre_array, new_size, encoder)
+
+    if workers is None or workers <= 1:
+        return [encode_slice(pre_array) for pre_array in color_stack]
+    from concurrent.futures import ThreadPoolExecutor
+
+    # PIL releases the GIL while resizing and encoding
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(encode_slice, color_stack))
+
+
+def _normalize(
+    img_data,  # type: np.ndarray
+    axis=None,  # type: Optional[Tuple[int, ...]]
+    stats=None,  # type: Optional[Tuple[float, float]]
+):
+    # type: (...) -> np.ndarray
+    """Center on the mean and scale by the std (in place) clipped to 0-1,
+    the statistics are computed for each image when axis is given or taken
+    from stats (mean, std) if they were computed beforehand"""
+    if stats is None:
+        keepdims = axis is not None
+        stats = (
+            img_data.mean(axis=axis, keepdims=keepdims),
+            img_data.std(axis=axis, keepdims=keepdims),
+        )
+    img_data -= stats[0]
+    img_data /= stats[1]
+    img_data += 0.5
+    return img_data.clip(0, 1, out=img_data)
+
+
+def sample_stats(
+    in_array,  # type: np.ndarray
+    sample_size=2 ** 20,  # type: int
+):
+    # type: (...) -> Tuple[float, float]
+    """The mean and std of a 2D array-like from a strided sample
+    :param in_array: the array (or memmap, h5py dataset, ...)
+    :param sample_size: the approximate maximum number of values to read
+    >>> [round(v, 2) for v in sample_stats(np.arange(400).reshape((20, 20)), 100)]
+    [189.0, 115.03]
+    """
+    height, width = np.shape(in_array)[0:2]
+    step = max(1, int(np.ceil(np.sqrt(float(height * width) / sample_size))))
+    sample = np.asarray(in_array[::step, ::step], dtype=np.float64)
+    return float(sample.mean()), float(sample.std())
+
+
+def block_reduce(
+    in_array,  # type: np.ndarray
+    factor,  # type: Union[int, Tuple[int, int]]
+    mode="mean",  # type: str
+    chunk_bytes=2 ** 26,  # type: int
+):
+    # type: (...) -> np.ndarray
+    """Shrink a 2D array-like by an integer factor reading it in row chunks,
+    rows and columns beyond the last full block are dropped
+    :param in_array: the array (or memmap, h5py dataset, ...)
+    :param factor: the size of the blocks (or the rows and columns of them)
+    :param mode: mean to average each block or stride to take every factor-th value
+    :param chunk_bytes: the approximate size of the chunks read at once
+    :return: a float32 array
+    >>> block_reduce(np.arange(20).reshape((4, 5)), 2)
+    array([[ 3.,  5.],
+           [13., 15.]], dtype=float32)
+    >>> block_reduce(np.arange(20).reshape((4, 5)), 2, mode="stride")
+    array([[ 0.,  2.],
+           [10., 12.]], dtype=float32)
+    >>> block_reduce(np.arange(20).reshape((4, 5)), (4, 5))
+    array([[9.5]], dtype=float32)
+    """
+    assert mode in ["mean", "stride"], "Reduce mode must be mean or stride: {}".format(
+        mode
+    )
+    row_factor, col_factor = (factor, factor) if np.isscalar(factor) else factor
+    height, width = np.shape(in_array)[0:2]
+    out_height, out_width = height // row_factor, width // col_factor
+    if mode == "stride":
+        return np.array(
+            in_array[
+                : out_height * row_factor : row_factor,
+                : out_width * col_factor : col_factor,
+            ],
+            dtype=np.float32,
+        )
+    out_array = np.empty((out_height, out_width), dtype=np.float32)
+    block_bytes = 4 * row_factor * col_factor * max(out_width, 1)
+    chunk_rows = max(1, chunk_bytes // block_bytes)
+    for start in range(0, out_height, chunk_rows):
+        stop = min(out_height, start + chunk_rows)
+        chunk = np.asarray(
+            in_array[start * row_factor : stop * row_factor, : out_width * col_factor],
+            dtype=np.float32,
+        )
+        out_array[start:stop] = chunk.reshape(
+            (stop - start, row_factor, out_width, col_factor)
+        ).mean(axis=(1, 3))
+    return out_array
+
+
+LUT_SIZE = 256
+_LUT_CACHE = {}  # type: Dict[str, np.ndarray]
+
+
+def colormap_lut(cmap="RdBu"):
+    # type: (...) -> np.ndarray
+    """A uint8 RGBA lookup table with LUT_SIZE colors for a colormap, an extra
+    last row holds the color for NaN values
+    >>> lut = colormap_lut("gray")
+    >>> lut.shape, lut.dtype
+    ((257, 4), dtype('uint8'))
+    >>> lut[0], lut[255], lut[256]
+    (array([  0,   0,   0, 255], dtype=uint8), array([255, 255, 255, 255], dtype=uint8), array([0, 0, 0, 0], dtype=uint8))
+    """
+    if isinstance(cmap, str) and cmap in _LUT_CACHE:
+        return _LUT_CACHE[cmap]
+    from matplotlib import cm
+
+    c_map = cm.get_cmap(cmap)
+    lut = np.zeros((LUT_SIZE + 1, 4), dtype=np.uint8)
+    # sample by position, integers would index the table of the colormap and
+    # colormaps with N != 256 (tab10, Set1, ...) would get the wrong colors
+    positions = (np.arange(LUT_SIZE) + 0.5) / LUT_SIZE
+    lut[:LUT_SIZE] = (c_map(positions) * 255).clip(0, 255).astype(np.uint8)
+    lut[LUT_SIZE] = (np.array(c_map(np.nan)) * 255).clip(0, 255).astype(np.uint8)
+    if isinstance(cmap, str):
+        _LUT_CACHE[cmap] = lut
+    return lut
+
+
+def apply_lut(
+    norm_data,  # type: np.ndarray
+    lut,  # type: np.ndarray
+):
+    # type: (...) -> np.ndarray
+    """Map values between 0 and 1 to colors (the same bins as a colormap)
+    >>> apply_lut(np.array([0.0, 0.5, 1.0, np.nan]), colormap_lut("gray"))[:, 0]
+    array([  0, 128, 255,   0], dtype=uint8)
+    >>> from matplotlib import cm
+    >>> x = np.linspace(0.05, 0.95, 10)
+    >>> mpl_colors = (cm.get_cmap("tab10")(x) * 255).astype(np.uint8)
+    >>> np.array_equal(apply_lut(x, colormap_lut("tab10")), mpl_colors)
+    True
+    """
+    lut_idx = np.multiply(norm_data, LUT_SIZE, dtype=np.float32)
+    nan_mask = np.isnan(lut_idx)
+    np.clip(lut_idx, 0, LUT_SIZE - 1, out=lut_idx)
+    lut_idx = lut_idx.astype(np.uint16)
+    lut_idx[nan_mask] = LUT_SIZE
+    return lut[lut_idx]
+
+
+def _encode_colored(
+    pre_array,  # type: np.ndarray
+    new_size,  # type: Tuple[int, int]
+    encoder,  # type: ImageEncoder
+):
+    # type: (...) -> str
+    """Pad to a square, resize and encode a colored image as base64"""
+    from PIL import Image as PImage
+
     max_dim = max(*pre_array.shape[0:2])
     sq_array = force_array_dim(pre_array, (max_dim, max_dim) + pre_array.shape[2:])
     p_data = PImage.fromarray(sq_array)
     rs_p_data = p_data.resize(new_size, resample=PImage.BICUBIC)
-    out_img_data = BytesIO()
-    if img_format == "jpeg" or not alpha:
-        rs_p_data = rs_p_data.convert("RGB")
-    rs_p_data.save(out_img_data, format=img_format)
-    out_img_data.seek(0)  # rewind
-    enc_img = base64.b64encode(out_img_data.read())
+    enc_img = base64.b64encode(encoder.encode(rs_p_data))
     return enc_img.decode("ascii").replace("\n", "")
 
 
-def _wrap_ur(data_uri):
-    return "data:image/png;base64,{0}".format(data_uri)
+def _wrap_ur(data_uri, mimetype="image/png"):
+    return "data:{0};base64,{1}".format(mimetype, data_uri)
+
+
+def benchmark_encoders(
+    in_img,  # type: PImage.Image
+    encoders,  # type: List[ImageEncoder]
+    repeats=3,  # type: int
+):
+    # type: (...) -> List[Dict[str, Any]]
+    """Compare the size and encode time of several encoders on one image
+    :param in_img: the image to encode (see fig_to_image)
+    :param encoders: the encoders to compare
+    :param repeats: the best of this many runs is reported
+    :return: a row for each encoder with the bytes and seconds
+    >>> from PIL import Image as PImage
+    >>> img = PImage.fromarray(np.zeros((32, 32, 4), dtype=np.uint8))
+    >>> rows = benchmark_encoders(img, [ImageEncoder("png"), ImageEncoder("jpeg")])
+    >>> [(row["encoder"].img_format, row["bytes"] > 0) for row in rows]
+    [('png', True), ('jpeg', True)]
+    """
+    rows = []
+    for encoder in encoders:
+        best_time = None
+        for _ in range(repeats):
+            start_time = time.time()
+            img_bytes = encoder.encode(in_img)
+            run_time = time.time() - start_time
+            best_time = run_time if best_time is None else min(best_time, run_time)
+        rows += [dict(encoder=encoder, bytes=len(img_bytes), seconds=best_time)]
+    return rows
 
 
 def force_array_dim(
@@ -107,7 +620,8 @@ def force_array_dim(
 ):
     # type: (...) -> np.ndarray
     """
-    force the dimensions of an array by using cropping and padding
+    force the dimensions of an array by using cropping and padding,
+    when only cropping is needed the result is a view of in_img (no copy)
     :param in_img:
     :param out_shape:
     :param pad_mode:
@@ -142,29 +656,48 @@ def force_array_dim(
     0.4375
     >>> o_img[0,3,:,0]
     array([0., 1., 1., 1., 1., 1., 1., 1., 1., 1., 0., 0.])
+    >>> big_img = np.zeros((512, 512, 4))
+    >>> np.shares_memory(force_array_dim(big_img, [64, 64, None]), big_img)
+    True
     """
     assert crop_mode in [
         "random",
         "center",
     ], "Crop mode must be random or " "center: {}".format(crop_mode)
 
-    pad_image = pad_nd_image(in_img, out_shape, mode=pad_mode, **pad_args)
+    # each axis is either cropped or padded so crop first (a view) and only
+    # pad what is left of the image
     crop_dims = []  # type: List[slice]
-    for c_shape, d_shape in zip(pad_image.shape, out_shape):
+    pad_dims = []  # type: List[Tuple[int, int]]
+    for c_shape, d_shape in zip(in_img.shape, out_shape):
         cur_slice = slice(0, c_shape)  # default
+        cur_pad = (0, 0)
         if d_shape is not None:
-            assert d_shape <= c_shape, "Padding command failed: {}>={} - {},{}".format(
-                d_shape, c_shape, pad_image.shape, out_shape
-            )
             if d_shape < c_shape:
                 if crop_mode == "random":
                     start_idx = np.random.choice(range(0, c_shape - d_shape + 1))
-                    cur_slice = slice(start_idx, start_idx + d_shape)
                 else:
                     start_idx = (c_shape - d_shape) // 2
-                    cur_slice = slice(start_idx, start_idx + d_shape)
+                cur_slice = slice(start_idx, start_idx + d_shape)
+            else:
+                cur_pad = _pad_widths(c_shape, d_shape)
         crop_dims += [cur_slice]
-    return pad_image.__getitem__(crop_dims)
+        pad_dims += [cur_pad]
+    crop_image = in_img[tuple(crop_dims)]
+    if not any(pad_before or pad_after for pad_before, pad_after in pad_dims):
+        return crop_image
+    pad_dims += [(0, 0)] * (in_img.ndim - len(pad_dims))
+    return np.pad(crop_image, pad_dims, mode=pad_mode, **pad_args)
+
+
+def _pad_widths(c_shape, d_shape):
+    # type: (int, int) -> Tuple[int, int]
+    """The padding before and after needed to grow c_shape to d_shape"""
+    if c_shape >= d_shape:
+        return 0, 0
+    dim_diff = d_shape - c_shape
+    pad_before = dim_diff // 2
+    return pad_before, dim_diff - pad_before
 
 
 def pad_nd_image(
@@ -207,9 +740,6 @@ def pad_nd_image(
     for c_shape, d_shape in zip(in_img.shape, out_shape):
         pad_before, pad_after = 0, 0
         if d_shape is not None:
-            if c_shape < d_shape:
-                dim_diff = d_shape - c_shape
-                pad_before = dim_diff // 2
-                pad_after = dim_diff - pad_before
+            pad_before, pad_after = _pad_widths(c_shape, d_shape)
         pad_dims += [(pad_before, pad_after)]
     return np.pad(in_img, pad_dims, mode=mode, **kwargs)
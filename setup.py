@@ -25,6 +25,7 @@ setup(
     long_description=io.open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
     install_requires=INSTALL_REQUIRES,
+    entry_points={"console_scripts": ["easy-dash=easy_dash.cli:main"]},
     url="https://github.com/kmader/easy_dash",
     classifiers=[
         "Development Status :: 1 - Alpha/Unstable",
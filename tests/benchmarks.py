@@ -0,0 +1,268 @@
+"""
+Headless benchmarks for the viz helpers and the callback dispatch.
+
+Run them and save a baseline on the current release with
+    python -m tests.benchmarks --save
+afterwards test_benchmarks.py (or python -m tests.benchmarks) compares every
+run against that baseline and reports the benchmarks which got slower.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+import dash_core_components as dcc
+import dash_html_components as html
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+
+from easy_dash import EasyDash  # noqa: E402
+from easy_dash.decimate import decimate_figure  # noqa: E402
+from easy_dash.mpl_plotly import mpl_to_plotly  # noqa: E402
+from easy_dash.viz import (  # noqa: E402
+    _np_to_uri,
+    fig_to_uri,
+    force_array_dim,
+    new_figure,
+    pad_nd_image,
+)
+from .utils import post_callback  # noqa: E402
+
+BASELINE_PATH = os.environ.get(
+    "EASYDASH_BENCH_BASELINE",
+    os.path.join(os.path.dirname(__file__), "benchmark_baseline.json"),
+)
+TOLERANCE = float(os.environ.get("EASYDASH_BENCH_TOLERANCE", "2.0"))
+# seconds importing easy_dash may add on top of importing dash
+IMPORT_BUDGET = float(os.environ.get("EASYDASH_IMPORT_BUDGET", "0.3"))
+# only imported when an app uses them (mpl_callback, image helpers, ...)
+LAZY_MODULES = [
+    "matplotlib",
+    "PIL",
+    "numpy",
+    "plotly.tools",
+    "dash_core_components",
+    "dash_html_components",
+]
+_IMPORT_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start_time, sorted(sys.modules)]))
+"""
+_timer = getattr(time, "perf_counter", time.time)
+
+# name -> setup function which returns the function to time
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    def register(setup_func):
+        BENCHMARKS[name] = setup_func
+        return setup_func
+
+    return register
+
+
+def _line_figure():
+    fig = new_figure(figsize=(6, 4))
+    ax1 = fig.add_subplot(111)
+    x_vals = np.linspace(0, 10, 1000)
+    ax1.plot(x_vals, np.sin(x_vals), "r-")
+    ax1.set_title("benchmark")
+    return fig
+
+
+for c_dpi in [50, 100, 200]:
+
+    @benchmark("fig_to_uri[dpi={}]".format(c_dpi))
+    def _fig_to_uri_setup(dpi=c_dpi):
+        fig = _line_figure()
+        return lambda: fig_to_uri(fig, close_all=False, dpi=dpi)
+
+
+for c_size in [64, 512, 2048]:
+    for c_format in ["png", "jpeg"]:
+        for c_cmap in ["RdBu", "viridis"]:
+
+            @benchmark(
+                "_np_to_uri[{}x{},{},{}]".format(c_size, c_size, c_format, c_cmap)
+            )
+            def _np_to_uri_setup(size=c_size, img_format=c_format, cmap=c_cmap):
+                in_img = np.random.RandomState(2018).uniform(size=(size, size))
+                return lambda: _np_to_uri(in_img, cmap=cmap, img_format=img_format)
+
+
+@benchmark("mpl_to_plotly[line_and_scatter]")
+def _mpl_to_plotly_setup():
+    fig = _line_figure()
+    fig.axes[0].scatter(np.arange(100), np.sin(np.arange(100)))
+    return lambda: mpl_to_plotly(fig)
+
+
+for c_method in ["minmax", "lttb"]:
+
+    @benchmark("decimate_figure[1M,{}]".format(c_method))
+    def _decimate_setup(method=c_method):
+        x_vals = np.linspace(0, 100, 1000000)
+        fig = dict(data=[dict(type="scatter", x=x_vals, y=np.sin(x_vals))])
+        return lambda: decimate_figure(fig, max_points=1000, method=method)
+
+
+@benchmark("force_array_dim[crop]")
+def _crop_setup():
+    in_vol = np.ones((64, 256, 256, 3), dtype=np.float32)
+    return lambda: force_array_dim(in_vol, [None, 128, 128, None])
+
+
+@benchmark("force_array_dim[crop_and_pad]")
+def _crop_pad_setup():
+    in_vol = np.ones((64, 256, 200, 3), dtype=np.float32)
+    return lambda: force_array_dim(in_vol, [None, 128, 256, None])
+
+
+@benchmark("pad_nd_image[pad]")
+def _pad_setup():
+    in_vol = np.ones((64, 200, 200, 3), dtype=np.float32)
+    return lambda: pad_nd_image(in_vol, [None, 256, 256, None])
+
+
+def _dispatch_app():
+    app = EasyDash("benchmark")
+    app.layout = html.Div(
+        [
+            dcc.Input(id="input", value="initial value"),
+            dcc.Input(id="plot_size", value="5"),
+            html.Div(id="output1"),
+            html.Div(id="plot"),
+        ]
+    )
+
+    @app.auto_callback()
+    def update_output1(input):
+        return input
+
+    @app.mpl_callback(threadsafe=True)
+    def update_plot(value_of_plot_size):
+        fig = new_figure(figsize=(float(value_of_plot_size), 5))
+        fig.add_subplot(111).plot([0, 1, 1, 0], [0, 0, 1, 1], "r-.")
+        return fig
+
+    return app.server.test_client()
+
+
+@benchmark("dispatch[auto_callback]")
+def _auto_dispatch_setup():
+    client = _dispatch_app()
+    return lambda: post_callback(
+        client, "output1.children", [("input", "value", "hello world")]
+    )
+
+
+@benchmark("dispatch[mpl_callback]")
+def _mpl_dispatch_setup():
+    client = _dispatch_app()
+    return lambda: post_callback(client, "plot.children", [("plot_size", "value", "5")])
+
+
+def run_benchmarks(names=None, repeats=5):
+    """
+    Time the benchmarks
+    :param names: only run benchmarks containing one of these strings
+    :param repeats: the best of this many runs is kept
+    :return: seconds by benchmark name
+    """
+    results = OrderedDict()
+    for name, setup_func in BENCHMARKS.items():
+        if names and not any(c_name in name for c_name in names):
+            continue
+        bench_func = setup_func()
+        bench_func()  # warm up
+        best_time = None
+        for _ in range(repeats):
+            start_time = _timer()
+            bench_func()
+            run_time = _timer() - start_time
+            best_time = run_time if best_time is None else min(best_time, run_time)
+        results[name] = best_time
+    return results
+
+
+def measure_import(module, repeats=3):
+    """
+    Import a module in new interpreters (a cold start, like a worker or a
+    command line call)
+    :return: the best time in seconds and the modules loaded by the import
+    """
+    best_time, modules = None, None
+    for _ in range(repeats):
+        output = subprocess.check_output(
+            [sys.executable, "-c", _IMPORT_SCRIPT.format(module=module)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        run_time, modules = json.loads(output.decode("utf8").strip().split("\n")[-1])
+        best_time = run_time if best_time is None else min(best_time, run_time)
+    return best_time, modules
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as in_file:
+        return json.load(in_file)["results"]
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, "w") as out_file:
+        json.dump(
+            dict(python=sys.version.split()[0], results=results),
+            out_file,
+            indent=2,
+        )
+
+
+def find_regressions(results, baseline, tolerance=TOLERANCE, min_delta=1e-3):
+    """The benchmarks which are more than tolerance times (and at least
+    min_delta seconds) slower than the baseline"""
+    return [
+        "{}: {:.4f}s (baseline {:.4f}s)".format(name, seconds, baseline[name])
+        for name, seconds in results.items()
+        if name in baseline
+        and seconds > tolerance * baseline[name]
+        and seconds - baseline[name] > min_delta
+    ]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--save", action="store_true", help="save as the baseline")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("names", nargs="*", help="only run matching benchmarks")
+    p_args = parser.parse_args(args)
+    results = run_benchmarks(p_args.names, repeats=p_args.repeats)
+    baseline = load_baseline()
+    for name, seconds in results.items():
+        ratio = ""
+        if name in baseline:
+            ratio = "{:6.2f}x".format(seconds / baseline[name])
+        print("{:45s} {:10.5f}s {}".format(name, seconds, ratio))
+    dash_time, _ = measure_import("dash")
+    import_time, _ = measure_import("easy_dash")
+    overhead = import_time - dash_time
+    print("{:45s} {:10.5f}s".format("import easy_dash (after dash)", overhead))
+    if p_args.save:
+        save_baseline(results)
+        print("Saved baseline to", BASELINE_PATH)
+    regressions = find_regressions(results, baseline)
+    for regression in regressions:
+        print("Regression", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import json
+import unittest
+
+from .benchmarks import (
+    BENCHMARKS,
+    IMPORT_BUDGET,
+    LAZY_MODULES,
+    _dispatch_app,
+    find_regressions,
+    load_baseline,
+    measure_import,
+    run_benchmarks,
+)
+from .utils import post_callback
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_dispatch(self):
+        client = _dispatch_app()
+        response = post_callback(
+            client, "output1.children", [("input", "value", "hello world")]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data)["response"]["output1"]["children"],
+            "hello world",
+        )
+
+        response = post_callback(client, "plot.children", [("plot_size", "value", "5")])
+        img_src = json.loads(response.data)["response"]["plot"]["children"]["props"][
+            "src"
+        ]
+        self.assertTrue(img_src.startswith("data:image/png;base64,"))
+
+    def test_benchmarks(self):
+        results = run_benchmarks(repeats=2)
+        self.assertEqual(list(results), list(BENCHMARKS))
+        # only compared when a baseline was saved with python -m tests.benchmarks --save
+        self.assertEqual(find_regressions(results, load_baseline()), [])
+
+    def test_import_time(self):
+        import_time, modules = measure_import("easy_dash")
+        self.assertEqual([c_mod for c_mod in LAZY_MODULES if c_mod in modules], [])
+        dash_time, _ = measure_import("dash")
+        self.assertLess(import_time - dash_time, IMPORT_BUDGET)
@@ -0,0 +1,796 @@
+import functools
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+import dash_core_components as dcc
+import dash_html_components as html
+
+from easy_dash import EasyDash
+from easy_dash.jobs import report_progress
+from .utils import callback_payload, post_callback, wait_for
+
+
+def _response(response):
+    return json.loads(response.data)["response"]
+
+
+class AutoCallbackTests(unittest.TestCase):
+    def setUp(self):
+        self.app = EasyDash(__name__)
+        self.app.layout = html.Div(
+            [
+                dcc.Input(id="inp", value="a"),
+                html.Div(id="out"),
+                html.Div(id="title"),
+                html.Div(id="rock_and_roll"),
+            ]
+        )
+        self.client = self.app.server.test_client()
+
+    def test_async_callback(self):
+        import asyncio
+
+        @self.app.auto_callback()
+        async def update_out(value_of_inp):
+            await asyncio.sleep(0.01)
+            return value_of_inp.upper()
+
+        response = post_callback(self.client, "out.children", [("inp", "value", "b")])
+        self.assertEqual(_response(response)["out"]["children"], "B")
+
+    def test_several_outputs(self):
+        @self.app.auto_callback()
+        def update_out_and_title_of_title(value_of_inp):
+            return value_of_inp, "title " + value_of_inp
+
+        response = post_callback(
+            self.client, "..out.children...title.title..", [("inp", "value", "b")]
+        )
+        self.assertEqual(
+            _response(response),
+            {"out": {"children": "b"}, "title": {"title": "title b"}},
+        )
+
+    def test_ids_with_and_are_kept(self):
+        @self.app.auto_callback()
+        def update_rock_and_roll(value_of_inp):
+            return value_of_inp * 2
+
+        response = post_callback(
+            self.client, "rock_and_roll.children", [("inp", "value", "b")]
+        )
+        self.assertEqual(_response(response)["rock_and_roll"]["children"], "bb")
+
+
+class BackgroundTests(unittest.TestCase):
+    OUTPUT = "..out.children...update_out_job_interval.disabled...update_out_job.data.."
+
+    def setUp(self):
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Input(id="inp", value="a"), html.Div(id="out")])
+        self.gate = threading.Event()
+        self.calls = []
+
+        @app.auto_callback(background=True)
+        def update_out(value_of_inp):
+            while not self.gate.wait(0.01):
+                report_progress(0.5, "Waiting")
+            self.calls.append(value_of_inp)
+            return "done {}".format(value_of_inp)
+
+        self.app = app
+        self.client = app.server.test_client()
+
+    def tearDown(self):
+        self.gate.set()
+
+    def start(self, value, job_id=None):
+        return _response(
+            post_callback(
+                self.client,
+                self.OUTPUT,
+                [
+                    ("inp", "value", value),
+                    ("update_out_job_interval", "n_intervals", 1),
+                ],
+                [("update_out_job", "data", job_id)],
+                changed=["inp.value"],
+            )
+        )
+
+    def poll(self, value, job_id):
+        return _response(
+            post_callback(
+                self.client,
+                self.OUTPUT,
+                [
+                    ("inp", "value", value),
+                    ("update_out_job_interval", "n_intervals", 2),
+                ],
+                [("update_out_job", "data", job_id)],
+                changed=["update_out_job_interval.n_intervals"],
+            )
+        )
+
+    def test_placeholder_and_poll(self):
+        response = self.start("a")
+        job_id = response["update_out_job"]["data"]
+        self.assertIsNotNone(job_id)
+        self.assertFalse(response["update_out_job_interval"]["disabled"])
+        self.assertEqual(response["out"]["children"]["type"], "Div")
+
+        self.gate.set()
+        self.app.job_queue().wait(job_id, timeout=5)
+        response = self.poll("a", job_id)
+        self.assertEqual(response["out"]["children"], "done a")
+        self.assertTrue(response["update_out_job_interval"]["disabled"])
+        self.assertIsNone(response["update_out_job"]["data"])
+
+    def test_identical_jobs_share_a_run(self):
+        job_id = self.start("a")["update_out_job"]["data"]
+        self.assertEqual(self.start("a")["update_out_job"]["data"], job_id)
+
+        self.gate.set()
+        self.app.job_queue().wait(job_id, timeout=5)
+        self.assertEqual(self.poll("a", job_id)["out"]["children"], "done a")
+        self.assertEqual(self.poll("a", job_id)["out"]["children"], "done a")
+        self.assertEqual(self.calls, ["a"])
+
+    def test_finished_jobs_are_not_reused(self):
+        self.gate.set()
+        for _ in range(2):
+            response = self.start("a")
+            job_id = response["update_out_job"]["data"]
+            if job_id is not None:  # slower than the quick job check
+                self.app.job_queue().wait(job_id, timeout=5)
+                response = self.poll("a", job_id)
+            self.assertEqual(response["out"]["children"], "done a")
+        self.assertEqual(self.calls, ["a", "a"])
+
+    def test_new_inputs_cancel_the_job(self):
+        old_id = self.start("a")["update_out_job"]["data"]
+        old_job = self.app.job_queue().get(old_id)
+        new_id = self.start("b", job_id=old_id)["update_out_job"]["data"]
+        self.assertNotEqual(new_id, old_id)
+        self.assertTrue(old_job.cancelled.is_set())
+        self.assertIsNone(self.app.job_queue().get(old_id))
+
+        self.gate.set()
+        self.app.job_queue().wait(new_id, timeout=5)
+        self.assertEqual(self.poll("b", new_id)["out"]["children"], "done b")
+        time.sleep(0.05)
+        self.assertEqual(self.calls, ["b"])
+
+
+class DecimateTests(unittest.TestCase):
+    def setUp(self):
+        import plotly.graph_objs as go
+
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Input(id="inp", value="1"), dcc.Graph(id="graph")])
+        self.calls = []
+
+        @app.auto_callback(decimate=100)
+        def update_figure_of_graph(value_of_inp):
+            self.calls.append(value_of_inp)
+            n_points = int(value_of_inp)
+            return go.Figure(go.Scatter(x=list(range(n_points)), y=[0] * n_points))
+
+        self.client = app.server.test_client()
+
+    def call(self, value, relayout=None):
+        return post_callback(
+            self.client,
+            "graph.figure",
+            [("inp", "value", value), ("graph", "relayoutData", relayout)],
+            changed=["inp.value" if relayout is None else "graph.relayoutData"],
+        )
+
+    def test_zoom_sends_the_visible_range(self):
+        figure = _response(self.call("5000"))["graph"]["figure"]
+        self.assertLessEqual(len(figure["data"][0]["x"]), 200)
+        zoom = {"xaxis.range[0]": 1000, "xaxis.range[1]": 1050}
+        figure = _response(self.call("5000", zoom))["graph"]["figure"]
+        self.assertGreaterEqual(min(figure["data"][0]["x"]), 999)
+        self.assertLessEqual(max(figure["data"][0]["x"]), 1051)
+        self.assertEqual(self.calls, ["5000"])
+
+    def test_zoom_keeps_small_figures(self):
+        figure = _response(self.call("50"))["graph"]["figure"]
+        self.assertEqual(len(figure["data"][0]["x"]), 50)
+        for c_start in [10, 20, 30]:
+            zoom = {"xaxis.range[0]": c_start, "xaxis.range[1]": c_start + 5}
+            self.assertEqual(self.call("50", zoom).status_code, 204)
+        self.assertEqual(self.calls, ["50"])
+
+
+class ImageCacheTests(unittest.TestCase):
+    def test_evicted_images_are_rendered_again(self):
+        from easy_dash.cache import ResultCache
+        from easy_dash.viz import new_figure
+
+        app = EasyDash(__name__, image_cache=ResultCache(max_size=1))
+        app.layout = html.Div(
+            [dcc.Input(id="plot_size", value="2"), html.Div(id="plot")]
+        )
+        calls = []
+
+        @app.mpl_callback(cache=True, image_src="url", threadsafe=True)
+        def update_plot(value_of_plot_size):
+            calls.append(value_of_plot_size)
+            fig = new_figure(figsize=(float(value_of_plot_size), 2))
+            fig.add_subplot(111).plot([0, 1])
+            return fig
+
+        client = app.server.test_client()
+
+        def image_src(value):
+            response = post_callback(
+                client, "plot.children", [("plot_size", "value", value)]
+            )
+            return _response(response)["plot"]["children"]["props"]["src"]
+
+        first_src = image_src("2")
+        self.assertNotEqual(image_src("3"), first_src)
+        # the image of the first plot was evicted by the second one
+        self.assertEqual(image_src("2"), first_src)
+        self.assertEqual(client.get(first_src).status_code, 200)
+        self.assertEqual(calls, ["2", "3", "2"])
+        # while a cached result whose image is there is not rendered again
+        self.assertEqual(image_src("2"), first_src)
+        self.assertEqual(calls, ["2", "3", "2"])
+
+
+class TileTests(unittest.TestCase):
+    def test_edge_tiles_are_reduced(self):
+        import numpy as np
+        from io import BytesIO
+        from PIL import Image as PImage
+
+        app = EasyDash(__name__)
+        viewer = app.tile_viewer(
+            "view", np.random.uniform(size=(600, 1025)), tile_size=256
+        )
+        app.layout = html.Div([viewer])
+        config = json.loads(viewer.srcDoc.split("var cfg = ")[1].split(";")[0])
+        client = app.server.test_client()
+        for level in range(config["max_level"] + 1):
+            span = 256 * 2 ** (config["max_level"] - level)
+            n_rows, n_cols = -(-600 // span), -(-1025 // span)
+            for row in range(n_rows):
+                for col in range(n_cols):
+                    response = client.get(
+                        "{}{}/{}/{}".format(config["url"], level, row, col)
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    width, height = PImage.open(BytesIO(response.data)).size
+                    self.assertLessEqual(max(width, height), 256)
+            if level > 0:
+                # the last column of tiles is a single column of the array
+                self.assertEqual(width, 1)
+        response = client.get("{}0/1/0".format(config["url"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class StreamTests(unittest.TestCase):
+    def test_pages_have_their_own_cursor(self):
+        from easy_dash.stream import RingBuffer
+
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Interval(id="interval"), dcc.Graph(id="graph")])
+        sensor = RingBuffer(capacity=100)
+
+        @app.stream_callback(max_points=50)
+        def update_extendData_of_graph(n_intervals_of_interval):
+            return sensor
+
+        client = app.server.test_client()
+
+        def poll(cursor):
+            response = post_callback(
+                client,
+                "..graph.extendData...update_extendData_of_graph_cursor.data..",
+                [("interval", "n_intervals", 1)],
+                [("update_extendData_of_graph_cursor", "data", cursor)],
+            )
+            if response.status_code == 204:
+                return None, cursor
+            result = _response(response)
+            return (
+                result["graph"]["extendData"][0]["y"],
+                result["update_extendData_of_graph_cursor"]["data"],
+            )
+
+        sensor.extend([0, 1], [10, 11])
+        first_y, first_cursor = poll(None)
+        self.assertEqual(first_y, [[10, 11]])
+        sensor.append(2, 12)
+        # a second tab of the same browser still gets every point
+        second_y, second_cursor = poll(None)
+        self.assertEqual(second_y, [[10, 11, 12]])
+        self.assertEqual(poll(first_cursor)[0], [[12]])
+        self.assertEqual(poll(second_cursor), (None, second_cursor))
+
+
+class CoalesceTests(unittest.TestCase):
+    def make_app(self, **callback_args):
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Input(id="inp", value="a"), html.Div(id="out")])
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+        @app.auto_callback(**callback_args)
+        def update_out(value_of_inp):
+            self.calls.append(value_of_inp)
+            self.started.set()
+            self.gate.wait(5)
+            return "done {}".format(value_of_inp)
+
+        return app
+
+    def post_in_thread(self, app, value, page, responses):
+        client = app.server.test_client()
+
+        def post():
+            responses[value, page] = post_callback(
+                client,
+                "..out.children...update_out_page.data..",
+                [("inp", "value", value)],
+                [("update_out_page", "data", page)],
+            )
+
+        c_thread = threading.Thread(target=post)
+        c_thread.start()
+        return c_thread
+
+    def tearDown(self):
+        self.gate.set()
+
+    def test_identical_calls_share_one_execution(self):
+        app = self.make_app(coalesce=True)
+        responses = {}
+        threads = [self.post_in_thread(app, "a", "tab1", responses)]
+        self.started.wait(5)
+        # other pages, the same inputs
+        for c_page in ["tab2", "tab3"]:
+            threads += [self.post_in_thread(app, "a", c_page, responses)]
+        time.sleep(0.1)
+        self.gate.set()
+        for c_thread in threads:
+            c_thread.join(5)
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(
+            [_response(c_resp)["out"]["children"] for c_resp in responses.values()],
+            ["done a"] * 3,
+        )
+
+    def test_superseded_calls_are_skipped(self):
+        app = self.make_app(coalesce=True)
+        responses = {}
+        threads = [self.post_in_thread(app, "a", "tab1", responses)]
+        self.started.wait(5)
+        # both wait for a, then c replaces b before it starts
+        for c_value in ["b", "c"]:
+            threads += [self.post_in_thread(app, c_value, "tab1", responses)]
+            time.sleep(0.1)
+        self.gate.set()
+        for c_thread in threads:
+            c_thread.join(5)
+        self.assertEqual(
+            {c_key[0]: c_resp.status_code for c_key, c_resp in responses.items()},
+            dict(a=200, b=204, c=200),
+        )
+        self.assertEqual(self.calls, ["a", "c"])
+
+    def test_tabs_of_one_browser_are_not_skipped(self):
+        app = self.make_app(coalesce=True)
+        responses = {}
+        threads = [self.post_in_thread(app, "a", "tab1", responses)]
+        self.started.wait(5)
+        for c_value, c_page in [("b", "tab2"), ("c", "tab1")]:
+            threads += [self.post_in_thread(app, c_value, c_page, responses)]
+            time.sleep(0.1)
+        self.gate.set()
+        for c_thread in threads:
+            c_thread.join(5)
+        self.assertEqual(_response(responses["b", "tab2"])["out"]["children"], "done b")
+        self.assertEqual(sorted(self.calls), ["a", "b", "c"])
+
+    def test_new_pages_get_an_id(self):
+        app = self.make_app(coalesce=True)
+        self.gate.set()
+        responses = {}
+        self.post_in_thread(app, "a", None, responses).join(5)
+        page = _response(responses["a", None])["update_out_page"]["data"]
+        self.assertEqual(len(page), 32)
+        self.post_in_thread(app, "b", page, responses).join(5)
+        self.assertNotIn("update_out_page", _response(responses["b", page]))
+
+    def test_debounce_skips_the_older_call(self):
+        app = self.make_app(debounce=0.3)
+        self.gate.set()
+        responses = {}
+        threads = [self.post_in_thread(app, "a", "tab1", responses)]
+        time.sleep(0.05)
+        threads += [self.post_in_thread(app, "b", "tab1", responses)]
+        for c_thread in threads:
+            c_thread.join(5)
+        self.assertEqual(responses["a", "tab1"].status_code, 204)
+        self.assertEqual(_response(responses["b", "tab1"])["out"]["children"], "done b")
+        self.assertEqual(self.calls, ["b"])
+
+
+class CacheTests(unittest.TestCase):
+    def test_cached_results_and_invalidation(self):
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Input(id="inp", value="a"), html.Div(id="out")])
+        calls = []
+
+        @app.auto_callback(cache=2)
+        def update_out(value_of_inp):
+            calls.append(value_of_inp)
+            return "{} at {}".format(value_of_inp, len(calls))
+
+        client = app.server.test_client()
+
+        def output(value):
+            response = post_callback(client, "out.children", [("inp", "value", value)])
+            return _response(response)["out"]["children"]
+
+        self.assertEqual(
+            [output("a"), output("a"), output("b")], ["a at 1"] * 2 + ["b at 2"]
+        )
+        stats = app.cache_stats()["update_out"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 2))
+        output("c")  # evicts a
+        self.assertEqual(output("a"), "a at 4")
+        app.invalidate_cache()
+        self.assertEqual(output("a"), "a at 5")
+
+
+class WarmTests(unittest.TestCase):
+    def test_warmed_results_are_hits(self):
+        app = EasyDash(__name__)
+        app.layout = html.Div(
+            [
+                dcc.Dropdown(id="color", options=["red", "blue"], value="red"),
+                dcc.Slider(id="size", min=1, max=3, step=1, value=2),
+                html.Div(id="out"),
+            ]
+        )
+        calls = []
+
+        @app.auto_callback(cache=True)
+        def update_out(value_of_color, value_of_size):
+            calls.append((value_of_color, value_of_size))
+            return "{} {}".format(value_of_color, value_of_size)
+
+        self.assertEqual(app.warm(wait=True), {"update_out": 6})
+        stats = app.cache_stats()["update_out"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (0, 6, 6))
+        client = app.server.test_client()
+        response = post_callback(
+            client, "out.children", [("color", "value", "blue"), ("size", "value", 3)]
+        )
+        self.assertEqual(_response(response)["out"]["children"], "blue 3")
+        self.assertEqual(app.cache_stats()["update_out"]["hits"], 1)
+        self.assertEqual(len(calls), 6)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_metrics_route(self):
+        from easy_dash.viz import new_figure
+
+        app = EasyDash(__name__)
+        app.layout = html.Div(
+            [dcc.Input(id="inp", value="a"), html.Div(id="out"), html.Div(id="plot")]
+        )
+
+        @app.auto_callback()
+        def update_out(value_of_inp):
+            return value_of_inp * 10
+
+        @app.mpl_callback(threadsafe=True)
+        def update_plot(value_of_inp):
+            fig = new_figure(figsize=(2, 2))
+            fig.add_subplot(111).plot([0, len(value_of_inp)])
+            return fig
+
+        client = app.server.test_client()
+        out_bytes = sum(
+            len(post_callback(client, "out.children", [("inp", "value", c_value)]).data)
+            for c_value in ["a", "bc"]
+        )
+        post_callback(client, "plot.children", [("inp", "value", "a")])
+        response = client.get("/_easydash/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        values = dict(
+            c_line.rsplit(" ", 1)
+            for c_line in response.data.decode().splitlines()
+            if not c_line.startswith("#")
+        )
+        self.assertEqual(
+            values['easydash_callback_calls_total{callback="update_out"}'], "2"
+        )
+        self.assertEqual(
+            values['easydash_callback_payload_bytes_total{callback="update_out"}'],
+            str(out_bytes),
+        )
+        for c_phase in ["build", "rasterize", "encode"]:
+            labels = 'callback="update_plot",phase="{}"'.format(c_phase)
+            self.assertEqual(
+                values["easydash_callback_phase_seconds_count{" + labels + "}"], "1"
+            )
+
+
+class CompressionTests(unittest.TestCase):
+    def setUp(self):
+        app = EasyDash(__name__)
+        app.layout = html.Div([dcc.Input(id="inp", value="a"), html.Div(id="out")])
+
+        @app.auto_callback()
+        def update_out(value_of_inp):
+            return value_of_inp * 300
+
+        self.app = app
+        self.client = app.server.test_client()
+
+    def post(self, value, encodings):
+        return post_callback(
+            self.client,
+            "out.children",
+            [("inp", "value", value)],
+            headers={"Accept-Encoding": encodings},
+        )
+
+    def test_negotiation(self):
+        import gzip
+
+        from easy_dash.compress import brotli
+
+        response = self.post("abc", "gzip, deflate")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        body = json.loads(gzip.decompress(response.data))
+        self.assertEqual(body["response"]["out"]["children"][:6], "abcabc")
+        self.assertNotIn("Content-Encoding", self.post("abc", "identity").headers)
+        # below min_size
+        self.assertNotIn("Content-Encoding", self.post("", "gzip").headers)
+        if brotli is not None:
+            response = self.post("abc", "gzip;q=0.5, br")
+            self.assertEqual(response.headers["Content-Encoding"], "br")
+            self.assertIn(b"abcabc", brotli.decompress(response.data))
+
+    def test_static_copies_are_cached(self):
+        layout_url = self.app.config.routes_pathname_prefix + "_dash-layout"
+        self.app.layout = html.Div([self.app.layout, html.P("x" * 1000)])
+        for _ in range(2):
+            response = self.client.get(layout_url, headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        stats = self.app.compression_stats()
+        self.assertEqual((stats["responses"]["gzip"], stats["cache_hits"]), (2, 1))
+        self.assertGreater(stats["bytes_saved"], 0)
+
+
+def update_proc_plot(value_of_proc_size):
+    from easy_dash.viz import new_figure
+
+    fig = new_figure(figsize=(float(value_of_proc_size), 2))
+    fig.add_subplot(111).plot([0, 1])
+    return fig
+
+
+def slow_plot(seconds):
+    time.sleep(seconds)
+    return update_proc_plot("2")
+
+
+class ProcessRenderTests(unittest.TestCase):
+    def setUp(self):
+        self.app = EasyDash(__name__)
+        self.app.layout = html.Div(
+            [dcc.Input(id="proc_size", value="2"), html.Div(id="proc_plot")]
+        )
+
+    def tearDown(self):
+        for c_renderer in self.app._renderers.values():
+            c_renderer.shutdown()
+
+    def test_render_in_a_worker(self):
+        self.app.mpl_callback(executor="process", workers=1, timeout=30)(
+            update_proc_plot
+        )
+        client = self.app.server.test_client()
+        response = post_callback(
+            client, "proc_plot.children", [("proc_size", "value", "3")]
+        )
+        src = _response(response)["proc_plot"]["children"]["props"]["src"]
+        self.assertTrue(src.startswith("data:image/png;base64,"))
+
+    def test_slow_renders_time_out(self):
+        from easy_dash.render import RenderTimeout
+
+        render = self.app.mpl_callback(
+            auto=False, executor="process", workers=1, timeout=0.2
+        )(slow_plot)
+        with self.assertRaises(RenderTimeout):
+            render(1)
+
+    def test_full_queue(self):
+        from easy_dash.render import (
+            ProcessRenderer,
+            RenderQueueFull,
+            register_render_func,
+        )
+
+        key = register_render_func(slow_plot)
+        renderer = ProcessRenderer(workers=1, max_pending=1, timeout=0.2)
+        try:
+            future = renderer.submit(key, [1])
+            with self.assertRaises(RenderQueueFull):
+                renderer.submit(key, [1])
+            self.assertEqual(future.result(timeout=30)[:4], b"\x89PNG")
+            # the slot is free again once the render is done
+            self.assertEqual(renderer.render(key, [0], timeout=30)[:4], b"\x89PNG")
+        finally:
+            renderer.shutdown()
+
+
+SERVE_APP = """
+import os
+import dash_core_components as dcc
+import dash_html_components as html
+from easy_dash import EasyDash
+from easy_dash.viz import new_figure
+
+app = EasyDash(__name__)
+app.layout = html.Div(
+    [dcc.Input(id="inp", value="a"), html.Div(id="out"), html.Div(id="plot")]
+)
+
+
+@app.auto_callback()
+def update_out(value_of_inp):
+    return str(os.getpid())
+
+
+@app.mpl_callback(image_src="url", threadsafe=True)
+def update_plot(value_of_inp):
+    fig = new_figure(figsize=(2, 2))
+    fig.add_subplot(111).plot([0, len(value_of_inp)])
+    return fig
+
+
+if __name__ == "__main__":
+    app.serve(port=int(os.environ["EASYDASH_PORT"]), workers=2, threads=2)
+"""
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "serve forks worker processes")
+class ServeTests(unittest.TestCase):
+    def setUp(self):
+        with socket.socket() as c_sock:
+            c_sock.bind(("127.0.0.1", 0))
+            port = c_sock.getsockname()[1]
+        self.url = "http://127.0.0.1:{}".format(port)
+        script_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, script_dir)
+        script = os.path.join(script_dir, "serve_app.py")
+        with open(script, "w") as out_file:
+            out_file.write(SERVE_APP)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, EASYDASH_PORT=str(port), PYTHONPATH=root)
+        self.server = subprocess.Popen(
+            [sys.executable, script],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        wait_for(self.is_up, timeout=20)
+
+    def tearDown(self):
+        if self.server.poll() is None:
+            self.server.kill()
+            self.server.wait()
+
+    def is_up(self):
+        try:
+            return urllib.request.urlopen(self.url + "/_dash-layout").status == 200
+        except OSError:
+            return False
+
+    def post(self, output):
+        request = urllib.request.Request(
+            self.url + "/_dash-update-component",
+            data=json.dumps(callback_payload(output, [("inp", "value", "a")])).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["response"]
+
+    def status(self, path):
+        try:
+            return urllib.request.urlopen(self.url + path).status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def worker_pid(self):
+        try:
+            return self.post("out.children")["out"]["children"]
+        except OSError:  # while the workers restart
+            return None
+
+    def test_workers_restart_and_stop(self):
+        pids = {self.worker_pid() for _ in range(10)}
+        src = self.post("plot.children")["plot"]["children"]["props"]["src"]
+        # whichever worker answers has the image
+        self.assertEqual([self.status(src) for _ in range(10)], [200] * 10)
+
+        self.server.send_signal(signal.SIGHUP)
+        wait_for(lambda: self.worker_pid() not in pids | {None}, timeout=20)
+        self.server.send_signal(signal.SIGTERM)
+        self.assertEqual(self.server.wait(timeout=40), 0)
+
+
+def _shout(func):
+    @functools.wraps(func)
+    def shouted(*args):
+        return func(*args).upper() + "!!!"
+
+    return shouted
+
+
+class ClientsideTests(unittest.TestCase):
+    def test_report_and_registered_callbacks(self):
+        app = EasyDash(__name__, auto_clientside=True)
+        app.layout = html.Div(
+            [dcc.Input(id="inp", value="abc")]
+            + [html.Div(id=c_id) for c_id in ["out1", "out2", "out3"]]
+        )
+
+        @app.auto_callback()
+        def update_out1(value_of_inp):
+            return "Hello {}!".format(value_of_inp)
+
+        @app.auto_callback()
+        def update_out2(value_of_inp):
+            return sorted(value_of_inp)
+
+        @app.auto_callback()
+        @_shout
+        def update_out3(value_of_inp):
+            return value_of_inp
+
+        self.assertEqual(
+            app.clientside_report(),
+            dict(
+                clientside=["update_out1"],
+                server=dict(
+                    update_out2="calls sorted", update_out3="wrapped by a decorator"
+                ),
+            ),
+        )
+        client = app.server.test_client()
+        dependencies = {
+            c_dep["output"]: c_dep["clientside_function"]
+            for c_dep in json.loads(client.get("/_dash-dependencies").data)
+        }
+        self.assertIsNotNone(dependencies["out1.children"])
+        self.assertIsNone(dependencies["out2.children"])
+        self.assertIsNone(dependencies["out3.children"])
+        self.assertIn("Hello ", "\n".join(app._inline_scripts))
+        response = post_callback(client, "out3.children", [("inp", "value", "abc")])
+        self.assertEqual(_response(response)["out3"]["children"], "ABC!!!")
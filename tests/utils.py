@@ -79,3 +79,47 @@ def assert_clean_console(TestClass):
 
     assert_no_console_warnings(TestClass)
     assert_no_console_errors(TestClass)
+
+
+def callback_payload(output, inputs, state=(), changed=None):
+    """
+    Builds the JSON body the dash renderer posts to _dash-update-component.
+    :param (str) output: the output as component_id.property (or
+    ..id_1.prop_1...id_2.prop_2.. for several outputs)
+    :param (list) inputs: (component_id, property, value) for each input
+    :param (list) state: (component_id, property, value) for each state
+    :param (list) changed: the component_id.property of the inputs which
+    triggered the call (default is all of them)
+    """
+
+    def to_deps(items):
+        return [
+            dict(id=c_id, property=c_prop, value=val) for c_id, c_prop, val in items
+        ]
+
+    def to_output(c_output):
+        output_id, output_prop = c_output.rsplit(".", 1)
+        return dict(id=output_id, property=output_prop)
+
+    if output.startswith(".."):
+        outputs = [to_output(c_out) for c_out in output[2:-2].split("...")]
+    else:
+        outputs = to_output(output)
+    if changed is None:
+        changed = ["{}.{}".format(c_id, c_prop) for c_id, c_prop, _ in inputs]
+    return dict(
+        output=output,
+        outputs=outputs,
+        inputs=to_deps(inputs),
+        changedPropIds=list(changed),
+        state=to_deps(state),
+    )
+
+
+def post_callback(client, output, inputs, state=(), changed=None, **kwargs):
+    """Call a callback through a flask test client and return the response."""
+    return client.post(
+        "/_dash-update-component",
+        json=callback_payload(output, inputs, state, changed),
+        **kwargs
+    )